@@ -1,4 +1,5 @@
 import Connect4Game as Game
+import Endgame_solver as Solver
 
 
 class AI_strategy(Game.Connect4GameStrategy): 
@@ -9,6 +10,10 @@ class AI_strategy(Game.Connect4GameStrategy):
     ------------------
     self.name: (str) 
               Optional parameter with default value
+    self.book: (OpeningBook or None)
+              Optional opening book whose moves are played instead of searching
+    self.endgame: (EndgameSolver or None)
+              Solver that plays the last moves perfectly, used once endgame_threshold cells or fewer are empty
     
     Methods
     -------
@@ -21,8 +26,13 @@ class AI_strategy(Game.Connect4GameStrategy):
     is_line_blocked: 
     
     """ 
-    def __init__(self, name="Yosef Birnbaum"):
+    # the strategy only reads the board, so it can be handed a GameState without copying the game
+    accepts_state = True
+
+    def __init__(self, name="Yosef Birnbaum", book=None, endgame_threshold=18):
         self.name = name
+        self.book = book
+        self.endgame = Solver.EndgameSolver(endgame_threshold) if endgame_threshold else None
         
         
     def strategy(self, game_safety_copy):
@@ -47,13 +57,9 @@ class AI_strategy(Game.Connect4GameStrategy):
         opponent = 3 - current_player
     
     
-        # create list of open cols. (I am aware that the instance has a methods for this, but using those methods proved to be more difficult).
-        # iterate through each col in board and if the top row (the first sublist indexed at 0) has an open space, indicating
-        # additional moves available in that column, append the col to list.
-        open_cols = []
-        for col in range(7):              
-            if state[0][col] == 0:
-                open_cols.append(col)
+        # create list of open cols. The candidate moves are the open columns without the ones that would let the
+        # opponent win right on top of our piece (unless every column would), so those are never even scored.
+        open_cols = self.candidate_moves(game_safety_copy)
             
                 
         # create list of available next moves on the game board by iterating through all cols in open_cols list
@@ -258,33 +264,24 @@ class AI_strategy(Game.Connect4GameStrategy):
         -------
         (bool): True if line is found and False if not
             """
-        # initialize a counter to hold the amount of consecutive values and reassign the values to be offset from their original 
-        # positions by one less than their size to be able to complete a line of the desired size. Offsetting enables the fuction 
-        # to look in different directions for a line.
-            count = 0
-            row -= (dr * (size - 1))
-            col -= (dc * (size - 1))
-            
-        # iterate through amount of spaces that can contain the line from the current index which is one less than double it's size.
-        # test if these spaces are on the board (since offseting especially from near the edges can be off the board) and if the desired
-        # value is found. For each consecutive value found add 1 to the count and if desired size is found return player value.
-            for _ in range((size * 2) - 1):
-                if 0 <= row < 6 and 0 <= col < 7 and game_state[row][col] == player_num:
-                    count += 1
-                    if count == size:
-                        return True
-                
-        # if any of the iterations yeild an index out of range or an opponents value, the count reverts back to zero
-                else:
-                    count = 0
-                    
-        # each iteration add one (or zero which does nothing) to the row/col index to explore the complete possible winning direction.
-        # if no line is found "None" will be returned
-                row += dr
-                col += dc
-                
-        # if no line is found return False
-            return False
+        # a line can only go through a cell of the player on the board (the cell above the top row is sometimes asked about)
+            if not 0 <= row < 6 or game_state[row][col] != player_num:
+                return False
+        # look up the cells ahead of and behind the current cell in this direction, up to three steps away. They are all on
+        # the board so no edges have to be tested. Count the player's values in a row on each side, stopping at the first 
+        # other value.
+            ahead, behind = Game.CELL_RAYS[row][col][Game.DIRECTION_INDEX[dr, dc]]
+            count = 1
+            for cell_row, cell_col in ahead:
+                if game_state[cell_row][cell_col] != player_num:
+                    break
+                count += 1
+            for cell_row, cell_col in behind:
+                if game_state[cell_row][cell_col] != player_num:
+                    break
+                count += 1
+        # the line is found if the values in a row through the current cell are at least the desired size
+            return count >= size
     
     def is_line_blocked(self, game_state, row, col, dr, dc, player_num):
         """
@@ -313,33 +310,13 @@ class AI_strategy(Game.Connect4GameStrategy):
         -------
         (bool): True if both positive and negative spaces on the total five index space is not useable, and False if not. 
         """
-        # Check two steps further in the positive direction
-        row_pos2 = row + 2 * dr
-        col_pos2 = col + 2 * dc
-
-        # Initialize as False as we will test for unusable edges and assign true if blocked
-        pos2_blocked = False
-
-        # Check if the spot is off the board or if it's occupied by the opponent's piece. If one of these conditions are met
-        # then the edge in the posotive direction is blocked. Since the OR statment returns True if one condition is met, so if
-        # either the positive edge isn't on the grid (hence the 'not') or the scpace is occupied by opponent, then pos2 = True
-        if not(0 <= row_pos2 < 6 and 0 <= col_pos2 < 7) or game_state[row_pos2][col_pos2] == 3 - player_num:
-               pos2_blocked = True
-
-
-        # Same for edge in the other direction. Check two steps further in the negative direction
-        row_neg2 = row - 2 * dr
-        col_neg2 = col - 2 * dc
-
-        # Initialize as False
-        neg2_blocked = False
-
-        # Same as before. Check if the spot is off the board or if it's occupied by the opponent's piece
-        if not (0 <= row_neg2 < 6 and 0 <= col_neg2 < 7) or game_state[row_neg2][col_neg2] == 3 - player_num:
-                neg2_blocked = True
+        # look up the two edges of the five index space, two steps ahead and two steps behind the current space. The table
+        # has None for an edge that is off the board.
+        edges = Game.CELL_FLANKS[row][col][Game.DIRECTION_INDEX[dr, dc]]
 
-        # if both posotive and negative edges of the total five index distance from the current space is not useable return True
-        if pos2_blocked and neg2_blocked:
-            return True
-        else:
-            return False
+        # an edge is blocked if it isn't on the grid or if it is occupied by the opponent. If both positive and negative 
+        # edges of the total five index distance from the current space are not useable return True
+        for edge in edges:
+            if edge is not None and game_state[edge[0]][edge[1]] != 3 - player_num:
+                return False
+        return True
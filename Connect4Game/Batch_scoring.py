@@ -0,0 +1,197 @@
+import numpy as np
+import AI_player
+
+# the four directions of a line as (row step, column step), in the order AI_strategy scores them
+DIRECTIONS = [(1, 1), (-1, 1), (0, 1), (1, 0)]
+DIAGONAL_DOWN, DIAGONAL_UP, HORIZONTAL, VERTICAL = range(4)
+
+# the bonus AI_strategy gives each column for being near the middle
+CENTER_BONUS = np.array([30, 30, 40, 50, 40, 30, 30])
+
+# score of a column that isn't a candidate, lower than any real score
+NOT_CANDIDATE = np.iinfo(np.int64).min
+
+
+def line_lengths(pieces):
+    """
+    This function finds, for every cell of a batch of boards and each direction, the length of the line a piece
+    of the player placed there would make: the cell itself plus the player's pieces in a row on both sides of it,
+    up to three on each side. This is the count AI_strategy.is_line compares with the size of the line. The
+    boards are shifted onto themselves one, two and three cells at a time, like a convolution along each
+    direction, so every cell of every board is done at once.
+
+    Parameters
+    ----------
+    pieces (ndarray)
+            Boolean array of shape (boards, 6, 7), True where the player has a piece.
+
+    Returns
+    -------
+    ndarray: array of shape (boards, 4, 6, 7) with the length for each direction in DIRECTIONS
+    """
+    padded = np.pad(pieces, ((0, 0), (3, 3), (3, 3)))
+    lengths = np.ones((pieces.shape[0], 4, 6, 7), dtype=np.int8)
+    for index, (dr, dc) in enumerate(DIRECTIONS):
+        for sign in (1, -1):
+            # the run stays True only while every cell so far in this direction is the player's
+            run = np.ones(pieces.shape, dtype=bool)
+            for step in range(1, 4):
+                row = 3 + sign * step * dr
+                col = 3 + sign * step * dc
+                run &= padded[:, row:row + 6, col:col + 7]
+                lengths[:, index] += run
+    return lengths
+
+
+def blocked(opponent_pieces):
+    """
+    This function finds, for every cell of a batch of boards and each direction, whether both cells two steps
+    away are off the board or the opponent's, which is what AI_strategy.is_line_blocked tests.
+
+    Parameters
+    ----------
+    opponent_pieces (ndarray)
+            Boolean array of shape (boards, 6, 7), True where the opponent has a piece.
+
+    Returns
+    -------
+    ndarray: boolean array of shape (boards, 4, 6, 7) for each direction in DIRECTIONS
+    """
+    # cells off the board count as blocked, so the padding is True
+    padded = np.pad(opponent_pieces, ((0, 0), (2, 2), (2, 2)), constant_values=True)
+    result = np.empty((opponent_pieces.shape[0], 4, 6, 7), dtype=bool)
+    for index, (dr, dc) in enumerate(DIRECTIONS):
+        ahead = padded[:, 2 + 2 * dr:8 + 2 * dr, 2 + 2 * dc:9 + 2 * dc]
+        behind = padded[:, 2 - 2 * dr:8 - 2 * dr, 2 - 2 * dc:9 - 2 * dc]
+        result[:, index] = ahead & behind
+    return result
+
+
+def score_candidates(boards, players, candidates):
+    """
+    This function scores the candidate moves of a batch of positions the same way AI_strategy.strategy does,
+    all the moves of all the positions at once.
+
+    AI_strategy tries the cell above each move by writing to state[row - 1]. For a move into the top row that
+    is state[-1], the bottom row of the same column, which is set back to 0 afterwards, so the bottom piece of
+    that column is missing from the board for the moves scored after it. The scores here do the same, so the
+    moves chosen are the same.
+
+    Parameters
+    ----------
+    boards (ndarray)
+            Integer array of shape (positions, 6, 7) with 0 for an empty cell and 1 or 2 for a piece, row 0 at
+            the top, like Connect4Game.board.
+    players (ndarray)
+            The player to move in each position.
+    candidates (ndarray)
+            Boolean array of shape (positions, 7), True for the columns to score.
+
+    Returns
+    -------
+    ndarray: array of shape (positions, 7) with the score of each column, NOT_CANDIDATE for other columns
+    """
+    boards = np.asarray(boards)
+    players = np.asarray(players).reshape(-1, 1, 1)
+    candidates = np.asarray(candidates, dtype=bool)
+    count = boards.shape[0]
+    # the row each move lands in, -1 for a full column
+    rows = (boards == 0).sum(axis=1) - 1
+    columns = np.arange(7)
+
+    # the bottom cells AI_strategy loses: for moves into the top row, in the column order it scores them in
+    lost = candidates & (rows == 0)
+    # boards seen while scoring each move of our own: bottoms lost by the moves before it only
+    first = np.repeat(boards[:, None], 7, axis=1)
+    lost_before = lost[:, None, :] & (columns[None, None, :] < columns[None, :, None])
+    first[:, :, 5, :] = np.where(lost_before, 0, first[:, :, 5, :])
+    first = first.reshape(count * 7, 6, 7)
+    first_players = np.repeat(players, 7, axis=0)
+    # the board seen while scoring the opponent's moves, after all of them
+    second = boards.copy()
+    second[:, 5, :] = np.where(lost, 0, second[:, 5, :])
+
+    own_lengths = line_lengths(first == first_players).reshape(count, 7, 4, 6, 7)
+    own_blocked = blocked(first == 3 - first_players).reshape(count, 7, 4, 6, 7)
+    opponent_lengths = line_lengths(first == 3 - first_players).reshape(count, 7, 4, 6, 7)
+    reply_lengths = line_lengths(second == 3 - players)
+    reply_blocked = blocked(second == players)
+
+    positions = np.arange(count)[:, None]
+    moves = columns[None, :]
+    row = np.maximum(rows, 0)
+    # the lengths at each move's own cell, (positions, 7, 4)
+    own = own_lengths[positions, moves, :, row, moves]
+    own_open = ~own_blocked[positions, moves, :, row, moves]
+    # the opponent's lengths at the cell above each move, none when the move is into the top row
+    above = opponent_lengths[positions, moves, :, np.maximum(rows - 1, 0), moves]
+    above = np.where((rows >= 1)[:, :, None], above, 0)
+    reply = reply_lengths[positions, :, row, moves]
+    reply_open = ~reply_blocked[positions, :, row, moves]
+
+    # our own lines
+    scores = 200000 * (own.max(axis=2) >= 4)
+    scores += 3000 * ((own[:, :, DIAGONAL_DOWN] >= 3) & own_open[:, :, DIAGONAL_DOWN])
+    scores += 3000 * ((own[:, :, DIAGONAL_UP] >= 3) & own_open[:, :, DIAGONAL_UP])
+    scores += 2800 * ((own[:, :, HORIZONTAL] >= 3) & own_open[:, :, HORIZONTAL])
+    scores += 2500 * ((own[:, :, VERTICAL] >= 3) & (rows > 0))
+    scores += 1000 * ((own[:, :, DIAGONAL_DOWN] >= 2) & own_open[:, :, DIAGONAL_DOWN])
+    scores += 1000 * ((own[:, :, DIAGONAL_UP] >= 2) & own_open[:, :, DIAGONAL_UP])
+    scores += 900 * ((own[:, :, VERTICAL] >= 2) & (rows > 1))
+    scores += 900 * ((own[:, :, HORIZONTAL] >= 2) & own_open[:, :, HORIZONTAL])
+    scores += CENTER_BONUS[None, :]
+    # the lines the move lets the opponent make on top of it
+    longest_above = above.max(axis=2)
+    scores -= 150000 * (longest_above >= 4) + 900 * (longest_above >= 3) + 600 * (longest_above >= 2)
+    # the lines the opponent would make by playing the move instead
+    scores += 100000 * (reply.max(axis=2) >= 4)
+    scores += 1500 * ((reply >= 3) & reply_open).any(axis=2)
+    scores += 500 * ((reply >= 2) & reply_open).any(axis=2)
+    return np.where(candidates, scores, NOT_CANDIDATE)
+
+
+def choose_moves(boards, players, candidates):
+    """
+    This function chooses AI_strategy's move in each of a batch of positions: the column with the highest
+    score, the lowest column of equal scores.
+
+    Parameters
+    ----------
+    boards, players, candidates (ndarray)
+            As for score_candidates.
+
+    Returns
+    -------
+    ndarray: the column chosen in each position
+    """
+    return score_candidates(boards, players, candidates).argmax(axis=1)
+
+
+class VectorizedAIStrategy(AI_player.AI_strategy):
+    """
+    This class inherits from AI_strategy and chooses the same moves, scoring all the candidate moves in one
+    pass with NumPy instead of one is_line call at a time.
+
+    Methods
+    -------
+
+    strategy: This method recieves a Connect4Game or GameState and returns the move with the best score.
+
+    """
+    def strategy(self, game_safety_copy):
+        """
+        This method recieves a Connect4Game or GameState and returns the move with the best score.
+
+        Parameters
+        ----------
+        game_safety_copy (object):
+                An instance of the Connect4Game class or a GameState.
+
+        Returns
+        -------
+        int: a number representing the column of the move to make
+        """
+        candidates = np.zeros((1, 7), dtype=bool)
+        candidates[0, self.candidate_moves(game_safety_copy)] = True
+        board = np.array(game_safety_copy.board)[None]
+        return int(choose_moves(board, [game_safety_copy.current_player], candidates)[0])
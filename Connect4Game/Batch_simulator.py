@@ -0,0 +1,104 @@
+import argparse
+import time
+import numpy as np
+import Connect4Game as Game
+
+# the shifts between neighbouring cells on a bitboard: vertical, horizontal and the two diagnols
+SHIFTS = [np.uint64(shift) for shift in (1, Game.COLUMN_BITS, Game.COLUMN_BITS - 1, Game.COLUMN_BITS + 1)]
+
+
+def has_four(pieces):
+    """
+    This function is Connect4Game.has_four for an array of bitboards.
+
+    Parameters
+    ----------
+    pieces (ndarray)
+            Bitboards of one player, as uint64.
+
+    Returns
+    -------
+    ndarray: True for each bitboard with a line of four
+    """
+    found = np.zeros(pieces.shape, dtype=bool)
+    for shift in SHIFTS:
+        pairs = pieces & (pieces >> shift)
+        found |= (pairs & (pairs >> (shift + shift))) != 0
+    return found
+
+
+def random_playouts(n_games, state=None, seed=None):
+    """
+    This function plays a batch of games with uniformly random moves, like two RandomStrategy players, all at the
+    same time. Every game of the batch makes its move in the same step, with NumPy arrays for the bitboards and
+    column heights of all the games, so each step costs a few array operations however many games there are.
+    Games that are over stop changing while the rest carry on.
+
+    Parameters
+    ----------
+    n_games (int)
+            Number of games to play.
+    state (GameState or None)
+            Position all the games start from, the empty board if None. It must not be won already.
+    seed (int or None)
+            Seed of the random numbers, for repeatable results.
+
+    Returns
+    -------
+    tuple: two arrays of n_games values, the winner of each game (1 or 2, 0 for a tie) and the number of moves on
+           the board at the end of each game
+    """
+    rng = np.random.default_rng(seed)
+    if state is None:
+        state = Game.Connect4Game().state()
+    start = state.to_game()
+    pieces = np.empty((2, n_games), dtype=np.uint64)
+    pieces[0] = start.bitboards[0]
+    pieces[1] = start.bitboards[1]
+    heights = np.tile(np.array(start.heights, dtype=np.int64), (n_games, 1))
+    winners = np.zeros(n_games, dtype=np.int8)
+    lengths = np.full(n_games, start.ply, dtype=np.int8)
+    # the column offsets of the bits of each column
+    column_bits = np.arange(7, dtype=np.int64) * Game.COLUMN_BITS
+    games = np.arange(n_games)
+    player = start.current_player
+    for ply in range(start.ply, 42):
+        # only the games that are still going are played. The winners of the others are already set.
+        active = games[winners[games] == 0] if ply > start.ply else games
+        if active.size == 0:
+            break
+        games = active
+        legal = heights[games] < 6
+        # a random number for every column, with full columns left at -1, so the largest number is a random
+        # legal column, each with the same chance
+        keys = np.where(legal, rng.random(legal.shape), -1.0)
+        columns = keys.argmax(axis=1)
+        bits = np.left_shift(np.uint64(1), (column_bits[columns] + heights[games, columns]).astype(np.uint64))
+        heights[games, columns] += 1
+        pieces[player - 1, games] |= bits
+        lengths[games] = ply + 1
+        winners[games[has_four(pieces[player - 1, games])]] = player
+        player = 3 - player
+    return winners, lengths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play random Connect Four games in batches with NumPy.")
+    parser.add_argument("--games", type=int, default=1000000, help="number of games to play")
+    parser.add_argument("--batch", type=int, default=100000, help="number of games played at the same time")
+    parser.add_argument("--seed", type=int, default=None, help="seed for repeatable results")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    all_winners, all_lengths = [], []
+    for batch_nr, first in enumerate(range(0, args.games, args.batch)):
+        seed = None if args.seed is None else args.seed + batch_nr
+        batch_winners, batch_lengths = random_playouts(min(args.batch, args.games - first), seed=seed)
+        all_winners.append(batch_winners)
+        all_lengths.append(batch_lengths)
+    elapsed = time.perf_counter() - start_time
+    all_winners = np.concatenate(all_winners)
+    all_lengths = np.concatenate(all_lengths)
+    print({"player 1": int((all_winners == 1).sum()), "player 2": int((all_winners == 2).sum()),
+           "tie": int((all_winners == 0).sum()), "average length": float(all_lengths.mean()),
+           "games per second": args.games / elapsed})
@@ -0,0 +1,405 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import Connect4Game as Game
+import Random_move as rand
+import AI_player as ai
+import main
+
+# number of positions perft reaches from the start position at each depth. Games that are won end there and are
+# not played on, which first makes a difference at depth 8.
+PERFT_COUNTS = {1: 7, 2: 49, 3: 343, 4: 2401, 5: 16807, 6: 117649, 7: 823536, 8: 5686266}
+
+# endings of the names of the measurements compare_results reports: rates, which are better higher, and latencies in
+# microseconds, which are better lower
+RATES = "per_second"
+LATENCIES = "_us"
+
+
+def random_games(count, seed):
+    """
+    This function plays games with uniformly random moves and returns the moves of each game, so the same games
+    can be replayed for every measurement and on every run.
+
+    Parameters
+    ----------
+    count (int)
+            Number of games.
+    seed (int)
+            Seed of the random moves.
+
+    Returns
+    -------
+    list: the list of columns played in each game
+    """
+    generator = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = Game.Connect4Game()
+        while game.winner is None and game.ply < 42:
+            game.make_move(generator.choice([col for col in range(7) if game.heights[col] < 6]))
+        games.append(game.moves)
+    return games
+
+
+def sample_positions(count, seed):
+    """
+    This function picks a fixed set of positions that aren't over, each one from a random game cut off after a
+    random number of moves.
+
+    Parameters
+    ----------
+    count (int)
+            Number of positions.
+    seed (int)
+            Seed of the games and of where they are cut off.
+
+    Returns
+    -------
+    list: the positions as GameStates
+    """
+    generator = random.Random(seed)
+    positions = []
+    for moves in random_games(count, seed):
+        game = Game.Connect4Game()
+        # the last move of a game ends it, so the position before it is the latest one still being played
+        for col in moves[:generator.randrange(len(moves))]:
+            game.make_move(col)
+        positions.append(game.state())
+    return positions
+
+
+def best_time(function, repeat):
+    """
+    This function runs a function several times and returns the shortest time it took. The shortest run is the
+    one the least disturbed by other processes, so it is the steadiest from one benchmark run to the next.
+
+    Parameters
+    ----------
+    function (function)
+            The function to time, called without arguments.
+    repeat (int)
+            Number of runs.
+
+    Returns
+    -------
+    float: seconds taken by the fastest run
+    """
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+def percentile(times, fraction):
+    """
+    This function returns a percentile of a list of times, the nearest value of the list without interpolating.
+
+    Parameters
+    ----------
+    times (list)
+            The times, sorted from shortest to longest.
+    fraction (float)
+            The percentile as a fraction, 0.5 for the median.
+
+    Returns
+    -------
+    float: the time
+    """
+    return times[min(len(times) - 1, int(fraction * len(times)))]
+
+
+def bench_make_move(games, repeat):
+    """
+    This function measures how fast Connect4Game.make_move plays, by replaying games on new boards. make_move
+    checks for a win after every move, so this covers the win check of a game as well.
+
+    Parameters
+    ----------
+    games (list)
+            The moves of each game, from random_games.
+    repeat (int)
+            Number of times to time the replay.
+
+    Returns
+    -------
+    dict: the number of moves, the seconds the fastest replay took and the moves per second
+    """
+    def replay():
+        for moves in games:
+            game = Game.Connect4Game()
+            for col in moves:
+                game.make_move(col)
+
+    moves = sum(len(moves) for moves in games)
+    seconds = best_time(replay, repeat)
+    return {"moves": moves, "seconds": seconds, "moves_per_second": moves / seconds}
+
+
+def bench_play_moves(games, repeat):
+    """
+    This function measures how fast Connect4Game.play_moves replays games, each game in one call.
+
+    Parameters
+    ----------
+    games (list)
+            The moves of each game, from random_games.
+    repeat (int)
+            Number of times to time the replay.
+
+    Returns
+    -------
+    dict: the number of moves, the seconds the fastest replay took and the moves per second
+    """
+    def replay():
+        for moves in games:
+            Game.Connect4Game().play_moves(moves)
+
+    moves = sum(len(moves) for moves in games)
+    seconds = best_time(replay, repeat)
+    return {"moves": moves, "seconds": seconds, "moves_per_second": moves / seconds}
+
+
+def bench_check_winner(positions, repeat):
+    """
+    This function measures how fast Connect4Game.check_winner checks the cells of a board for a line of four,
+    on every cell of every position.
+
+    Parameters
+    ----------
+    positions (list)
+            The positions, from sample_positions.
+    repeat (int)
+            Number of times to time the checks.
+
+    Returns
+    -------
+    dict: the number of checks, the seconds the fastest run took and the checks per second
+    """
+    games = [position.to_game() for position in positions]
+
+    def check():
+        for game in games:
+            for row in range(6):
+                for col in range(7):
+                    game.check_winner(row, col)
+
+    checks = 42 * len(games)
+    seconds = best_time(check, repeat)
+    return {"checks": checks, "seconds": seconds, "checks_per_second": checks / seconds}
+
+
+def bench_strategy(strategy, positions, seed):
+    """
+    This function measures how long the strategy method of a strategy takes for each position, one call at a
+    time, and summarizes the times. The position is handed over the way choose_move would hand it (a GameState or
+    a Connect4Game), but only the strategy call itself is timed.
+
+    Parameters
+    ----------
+    strategy (object)
+            An instance of a Connect4GameStrategy subclass.
+    positions (list)
+            The positions, from sample_positions.
+    seed (int)
+            Seed of the random module, for strategies that use it.
+
+    Returns
+    -------
+    dict: the number of calls and the mean, median (p50), p99 and longest time of a call in microseconds
+    """
+    arguments = [position if strategy.accepts_state else position.to_game() for position in positions]
+    random.seed(seed)
+    # one call first, so anything the strategy sets up on its first move isn't counted
+    strategy.strategy(arguments[0])
+    times = []
+    for argument in arguments:
+        start_time = time.perf_counter_ns()
+        strategy.strategy(argument)
+        times.append((time.perf_counter_ns() - start_time) / 1000)
+    times.sort()
+    return {"calls": len(times), "mean_us": sum(times) / len(times), "p50_us": percentile(times, 0.5),
+            "p99_us": percentile(times, 0.99), "max_us": times[-1]}
+
+
+def perft(game, depth):
+    """
+    This function counts the positions reached by playing every sequence of valid moves of a given length from
+    a position, making and taking back the moves on one game. A game that is won isn't played on. The counts
+    are known for the start position (PERFT_COUNTS), so this checks the move rules as well as timing them.
+
+    Parameters
+    ----------
+    game (object)
+            An instance of the Connect4Game class, left as it was.
+    depth (int)
+            Number of moves to play.
+
+    Returns
+    -------
+    int: the number of positions reached
+    """
+    if depth == 0 or game.winner is not None:
+        return 1
+    nodes = 0
+    heights = game.heights
+    for col in range(7):
+        if heights[col] < 6:
+            game.make_move(col)
+            nodes += perft(game, depth - 1)
+            game.unmake_move()
+    return nodes
+
+
+def bench_perft(max_depth):
+    """
+    This function runs perft from the start position to each depth up to max_depth and times it.
+
+    Parameters
+    ----------
+    max_depth (int)
+            The deepest perft to run.
+
+    Returns
+    -------
+    dict: for each depth, the number of positions, the known number (None if it isn't known), the seconds taken
+          and the positions per second
+    """
+    results = {}
+    for depth in range(1, max_depth + 1):
+        start_time = time.perf_counter()
+        nodes = perft(Game.Connect4Game(), depth)
+        seconds = time.perf_counter() - start_time
+        # JSON keys are strings, so the depths are made strings here to be the same after a file is read back
+        results[str(depth)] = {"nodes": nodes, "expected": PERFT_COUNTS.get(depth), "seconds": seconds,
+                               "nodes_per_second": nodes / seconds}
+    return results
+
+
+def bench_full_games(games, seed):
+    """
+    This function measures how fast main.run_tournament plays whole games between two RandomStrategy players,
+    in one process, with each player in its StrategyHost worker like in a tournament.
+
+    Parameters
+    ----------
+    games (int)
+            Number of games.
+    seed (int)
+            Seed of the tournament.
+
+    Returns
+    -------
+    dict: the number of games, the results, the seconds taken and the games per second
+    """
+    competitor_list = [rand.RandomStrategy(), rand.RandomStrategy("alter ego")]
+    start_time = time.perf_counter()
+    results = main.run_tournament(competitor_list, games, workers=1, seed=seed)
+    seconds = time.perf_counter() - start_time
+    return {"games": games, "results": results, "seconds": seconds, "games_per_second": games / seconds}
+
+
+def run_benchmarks(seed=0, games=200, positions=500, repeat=5, perft_depth=7, tournament_games=200):
+    """
+    This function runs every benchmark with the same fixed games and positions and collects the results.
+
+    Parameters
+    ----------
+    seed (int)
+            Seed of the games, positions and tournament.
+    games (int)
+            Number of random games replayed for make_move and play_moves.
+    positions (int)
+            Number of positions for check_winner and the strategies.
+    repeat (int)
+            Number of times the make_move and check_winner benchmarks are timed.
+    perft_depth (int)
+            The deepest perft to run.
+    tournament_games (int)
+            Number of games played through main.run_tournament.
+
+    Returns
+    -------
+    dict: the settings, the machine and the results of each benchmark
+    """
+    game_moves = random_games(games, seed)
+    position_set = sample_positions(positions, seed + 1)
+    return {
+        "settings": {"seed": seed, "games": games, "positions": positions, "repeat": repeat,
+                     "perft_depth": perft_depth, "tournament_games": tournament_games},
+        "machine": {"python": sys.version.split()[0], "implementation": platform.python_implementation(),
+                    "platform": platform.platform(), "cpus": os.cpu_count(), "time": time.time()},
+        "make_move": bench_make_move(game_moves, repeat),
+        "play_moves": bench_play_moves(game_moves, repeat),
+        "check_winner": bench_check_winner(position_set, repeat),
+        "strategies": {
+            "RandomStrategy": bench_strategy(rand.RandomStrategy(), position_set, seed),
+            "AI_strategy": bench_strategy(ai.AI_strategy(), position_set, seed),
+        },
+        "perft": bench_perft(perft_depth),
+        "full_games": bench_full_games(tournament_games, seed),
+    }
+
+
+def compare_results(baseline, results, prefix=""):
+    """
+    This function lists how much every rate and latency of a benchmark run changed from an earlier run. Rates
+    (per second) are better higher and latencies (microseconds) are better lower.
+
+    Parameters
+    ----------
+    baseline, results (dict)
+            The earlier run and the new one, from run_benchmarks or their JSON files.
+    prefix (str)
+            Name of the part of the results being compared, for the lines of the report.
+
+    Returns
+    -------
+    list: lines of the report, one for each measurement found in both runs
+    """
+    lines = []
+    for name, value in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        if isinstance(value, dict):
+            lines.extend(compare_results(old, value, f"{prefix}{name}."))
+        elif (name.endswith(RATES) or name.endswith(LATENCIES)) and old:
+            change = (value - old) / old * 100
+            # a positive change of a latency is a slowdown
+            slower = change < 0 if name.endswith(RATES) else change > 0
+            lines.append(f"{prefix}{name}: {old:.6g} -> {value:.6g} ({change:+.1f}%{', slower' if slower else ''})")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Connect Four rules and strategies.")
+    parser.add_argument("--output", default=None, help="JSON file to write the results to, printed if not given")
+    parser.add_argument("--baseline", default=None, help="JSON file of an earlier run to compare the results with")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the games and positions")
+    parser.add_argument("--games", type=int, default=200, help="number of random games replayed for make_move and play_moves")
+    parser.add_argument("--positions", type=int, default=500, help="number of positions for the strategies")
+    parser.add_argument("--repeat", type=int, default=5, help="number of times the rules benchmarks are timed")
+    parser.add_argument("--perft-depth", type=int, default=7, help="deepest perft to run")
+    parser.add_argument("--tournament-games", type=int, default=200, help="number of games played through main.py")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.seed, args.games, args.positions, args.repeat, args.perft_depth,
+                             args.tournament_games)
+    for depth, entry in results["perft"].items():
+        if entry["expected"] is not None and entry["nodes"] != entry["expected"]:
+            print(f"perft({depth}) found {entry['nodes']} positions instead of {entry['expected']}", file=sys.stderr)
+    if args.output is None:
+        print(json.dumps(results, indent=2))
+    else:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            print("\n".join(compare_results(json.load(file), results)))
@@ -4,6 +4,9 @@ from tkinter import messagebox
 # import the Connect4Game file and name it as game for brevity.
 import Connect4Game as game
 
+# the color of the disc in a box: white for an empty box, red for player 1 and yellow for player 2
+COLORS = {0: "white", 1: "red", 2: "yellow"}
+
 
 class Connect4GUI:
     """
@@ -26,6 +29,10 @@ class Connect4GUI:
                   
     self.canvas (tkinter widget)
                  Displays the game board with different colored circles for each player.
+
+    self.discs (list)
+                 The canvas item id of the disc in each box, by row and column, so a disc can be recolored
+                 without drawing the board again.
                  
     Methods
     -------
@@ -34,8 +41,12 @@ class Connect4GUI:
                be made and implements them. 
                Displays end of game message, and closes tkinter window without option for another game.
                
-    draw_board: Draws the boxes for game board, inserts discs onto board to reflect the game state, and
-                detremines weather the number boxes above board should be enabled or disabled
+    create_board: Draws the boxes for game board and an empty disc in each box, once when the app opens.
+
+    draw_board: Colors every disc on the board to reflect the game state, and detremines weather the number
+                boxes above board should be enabled or disabled
+
+    draw_move: Colors only the disc of the last move and updates only the button of its column.
     
     
     """
@@ -65,7 +76,10 @@ class Connect4GUI:
         self.canvas = tk.Canvas(master, width=7 * 60, height=6 * 60)
     # canvas is on row beneath the number buttons all the way to the left and spanning entire width of screen
         self.canvas.grid(row=1, column=0, columnspan=7)
-    # call the function to draw the game board to show the board when app opens
+    # draw the boxes and discs once. After this only their colors change.
+        self.discs = []
+        self.create_board()
+    # call the function to color the game board to show the board when app opens
         self.draw_board()
 
     def make_move(self, column):
@@ -81,9 +95,9 @@ class Connect4GUI:
         """
     # call the make_move function from the Connect4Game file
         self.game.make_move(column)
-    # call the draw_board function to redo the game board based on information gotten from the make_move function on 
+    # call the draw_move function to color the disc of the move based on information gotten from the make_move function on 
     # the Connect4Game file
-        self.draw_board()
+        self.draw_move()
     # check if self.winner on the Connect4Game file has a value for a winner
         if self.game.winner is not None:
     # get the value of self.winner and insert it into a wining message
@@ -93,16 +107,15 @@ class Connect4GUI:
     # close application when user clicks on msg box
             self.master.destroy()
 
-    def draw_board(self):
+    def create_board(self):
         """
-        This method draws the boxes for game board, inserts circles onto board to reflect the game state, and
-        detremines weather the number boxes above board should be enabled or disabled.
+        This method draws the boxes for game board and an empty (white) disc in each box. It is called once when
+        the app opens, and the ids of the discs are kept so later moves only change the color of one disc.
         
         """
-    # one way to keep the board synchronized with the game state is to clear it and repopulate if each move
-        self.canvas.delete("all")
     # loop through all rows of board
         for row in range(6):
+            row_discs = []
     # loop through all column to create a total of 42 boxes
             for col in range(7):
     # variables for the coordinates of each box. The first line represents the top left corner of each box
@@ -115,25 +128,63 @@ class Connect4GUI:
                 x1, y1 = x0 + 60, y0 + 60
     # create a box with current values of coordinates based on current iteration of loops.
                 self.canvas.create_rectangle(x0, y0, x1, y1, outline="black", fill="white")
-                
-    # accessing information from the board attribute of the Connect4Game class which holds all of the game moves
-    # for each iteration of the loop assess the value of the box and display a circle if the box should have a value
-                if self.game.board[row][col] == 1:
-    # for player 1, create a red circle offset by 5 in both directions from the coordinates of the current box
-                    self.canvas.create_oval(x0 + 5, y0 + 5, x1 - 5, y1 - 5, fill="red", outline="red")
-    # same for player 2 but with yellow circle
-                elif self.game.board[row][col] == 2:
-                    self.canvas.create_oval(x0 + 5, y0 + 5, x1 - 5, y1 - 5, fill="yellow", outline="yellow")
-                    
+    # create the disc offset by 5 in both directions from the coordinates of the current box. It is white like the
+    # box until a player's disc is dropped into it.
+                row_discs.append(self.canvas.create_oval(x0 + 5, y0 + 5, x1 - 5, y1 - 5, fill="white", outline="white"))
+            self.discs.append(row_discs)
+
+    def draw_board(self):
+        """
+        This method colors every disc on the board to reflect the game state, and detremines weather the number 
+        boxes above board should be enabled or disabled. Only needed when the whole board may have changed, after
+        a single move draw_move does the same work for the one box that changed.
+        
+        """
+    # accessing information from the board attribute of the Connect4Game class which holds all of the game moves.
+    # The board is built from the bitboards every time it is read, so it is read once for all the boxes.
+        board = self.game.board
+    # for each box give the disc the color of the player whose disc it is, or white if it is empty
+        for row in range(6):
+            for col in range(7):
+                color = COLORS[board[row][col]]
+                self.canvas.itemconfigure(self.discs[row][col], fill=color, outline=color)
     # loop through all buttons with nums and check if top box in each colum is empty in order to know it button should be disabled 
         for col in range(7):
-    # The test is done by using the iteration number as an index for the first sublist of self.board attribute 
-    # from the Connect4Game file and chcecking if it is still empty.
-            if self.game.board[0][col] == 0:
-                self.buttons[col]["state"] = tk.NORMAL
-            else:
+            self.update_button(col)
+
+    def draw_move(self):
+        """
+        This method colors the disc of the last move made and updates the button of its column. No other box or
+        button can have changed, so this is the only drawing needed after a move.
+        
+        """
+    # the column of the last move is on top of the move stack of the Connect4Game, and the disc landed in the
+    # highest filled box of that column (row 0 is the top row of the board)
+        col = self.game.moves[-1]
+        row = 6 - self.game.heights[col]
+    # the disc is player 1's if its bit is set on player 1's bitboard. Reading the one bit saves building the
+    # whole nested list board.
+        player = 1 if self.game.bitboards[0] & game.cell_bit(row, col) else 2
+        color = COLORS[player]
+        self.canvas.itemconfigure(self.discs[row][col], fill=color, outline=color)
+        self.update_button(col)
+
+    def update_button(self, col):
+        """
+        This method enables the button of a column if the column still has an empty box and disables it if not.
+        
+        Parameters
+        ----------
+        col (int)
+                The column of the button.
+        """
+    # The test is done by using the column number as an index for the heights attribute from the Connect4Game
+    # file and chcecking if the column has less than six discs.
+        if self.game.heights[col] < 6:
+            self.buttons[col]["state"] = tk.NORMAL
+        else:
     # if column is full disable the command from the button
-                self.buttons[col]["state"] = tk.DISABLED
+            self.buttons[col]["state"] = tk.DISABLED
 
 
 if __name__ == "__main__":
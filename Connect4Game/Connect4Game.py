@@ -3,11 +3,242 @@
 # with real commands. These classes are useful as they can be thought of as a bluepring for classes that inherit
 # from them which must contain code to properly define these methods.
 from abc import (ABC, abstractmethod)
+# the clocks read to time each move a strategy chooses
+import time
+
+# number of bits used for each column of a bitboard. A column has six rows plus a spare bit on top which always stays
+# empty, so a line shifted past the top of one column never runs into the bottom of the next column.
+COLUMN_BITS = 7
+# the bottom cell of every column, and every cell of the board (without the spare bits)
+BOTTOM_MASK = sum(1 << (col * COLUMN_BITS) for col in range(7))
+BOARD_MASK = BOTTOM_MASK * 0b111111
+# all the bits of one column, the spare bit included
+COLUMN_MASK = (1 << COLUMN_BITS) - 1
+# the bits of columns 0 to 3, for mirror_key
+_MIRROR_MASKS = [COLUMN_MASK << (col * COLUMN_BITS) for col in range(4)]
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its deadline has passed, to unwind the search back to the root.
+    """
+
+
+# the largest part of a move's time limit the endgame solver may use, so the strategy still has the rest of the
+# time if the solver runs out of it
+ENDGAME_SHARE = 0.5
 
 
 class Connect4GameStrategy(ABC):
+    """
+    Blueprint for every strategy. A strategy is handed a GameState through choose_move. Strategies that only
+    read the position (board, current_player, is_valid_move) set accepts_state to True and get the GameState
+    itself, with nothing copied. Any other strategy gets a Connect4Game rebuilt from the state, so it can call
+    make_move on it as before without tampering with the real game.
+
+    A strategy with an opening book (an object with a lookup(key) method, like Opening_book.OpeningBook) plays
+    the book move of any position found in it without calling strategy at all. In the same way, a strategy with
+    an endgame solver (like Endgame_solver.EndgameSolver) plays the solver's perfect move once few enough cells
+    are left empty, and only falls back on strategy if the solver runs out of time.
+
+    A strategy with a time limit has one clock for the whole move, started by choose_move: the solver is given at
+    most ENDGAME_SHARE of the time, and the strategy searches until the same deadline (see search_deadline), so
+    the move never takes longer than time_limit however it was found.
+
+    Before any of that, a tactical strategy plays a winning move or blocks the opponent's win straight away,
+    found with a few bitboard operations (see tactics). Strategies prune the moves that would let the opponent
+    win on top of them by choosing from candidate_moves.
+
+    Every move chosen is measured, and the measurements are left in metrics until the next move:
+
+    source: where the move came from: "book", "tactics", "endgame" or "strategy"
+    wall_time, cpu_time: seconds the move took on the clock and of CPU time of the thread that chose it (CPU
+                         time spent in other processes, like the helpers of ParallelNegamaxStrategy, isn't
+                         counted)
+    nodes: positions the search visited, 0 for strategies that don't search
+    depth: moves the search looked ahead
+    cache_hits, cache_misses: transposition table probes that found or didn't find their position
+    timeouts: searches the clock cut short, whose move came from an earlier search or from strategy instead
+
+    Recording them costs a few clock and counter reads per move, so it is always on. Strategies report their
+    own numbers through search_metrics and search_counters.
+    """
+    # True when strategy can work directly on a GameState
+    accepts_state = False
+    # the opening book consulted before the strategy, or None
+    book = None
+    # the solver used instead of the strategy near the end of the game, or None
+    endgame = None
+    # True when choose_move plays wins and blocks itself, and candidate_moves leaves out moves that let the
+    # opponent win
+    tactical = True
+    # the measurements of the last move chosen, or None before the first move
+    metrics = None
+    # seconds each move may take, or None for a strategy without a time limit
+    time_limit = None
+    # the time.perf_counter() value the move choose_move is choosing must be ready by, or None
+    move_deadline = None
+
     def __init__(self):
         ...
+
+    def choose_move(self, state):
+        """
+        This method hands a position to the strategy method in the form the strategy accepts, and records the
+        measurements of the move in metrics.
+        
+        Parameters
+        ----------
+        state (GameState):
+                The position to choose a move for.
+                
+        Returns
+        -------
+        int: a number representing the column of the move to make
+        """
+        counters = self.search_counters()
+        start_time = time.perf_counter()
+        start_cpu = time.thread_time()
+        metrics = {"source": "strategy", "nodes": 0, "depth": 0, "timeouts": 0}
+        if self.time_limit is not None:
+            self.move_deadline = start_time + self.time_limit
+        try:
+            move = self._select_move(state, metrics)
+        finally:
+            self.move_deadline = None
+        metrics["wall_time"] = time.perf_counter() - start_time
+        metrics["cpu_time"] = time.thread_time() - start_cpu
+        # the counters only go up, so what this move added is the difference
+        for name, value in self.search_counters().items():
+            metrics[name] = value - counters[name]
+        self.metrics = metrics
+        return move
+
+    def _select_move(self, state, metrics):
+        # the book, tactics, endgame solver and strategy in turn, noting which one chose the move
+        if self.book is not None:
+            entry = self.book.lookup(state.key())
+            if entry is not None:
+                metrics["source"] = "book"
+                return entry[0]
+        if self.tactical:
+            move = self.tactical_move(state)
+            if move is not None:
+                metrics["source"] = "tactics"
+                return move
+        if self.endgame is not None and self.endgame.applies(state):
+            solver_deadline = None
+            if self.move_deadline is not None:
+                solver_deadline = time.perf_counter() + ENDGAME_SHARE * (self.move_deadline - time.perf_counter())
+            solved = self.endgame.best_move(state, solver_deadline)
+            metrics["nodes"] = self.endgame.nodes
+            if solved is not None:
+                metrics["source"] = "endgame"
+                # the solver searches to the end of the game
+                metrics["depth"] = 42 - count_bits(state.bitboards[0] | state.bitboards[1])
+                return solved[0]
+            # the solver ran out of time, and the strategy chooses the move instead
+            metrics["timeouts"] += 1
+        if self.accepts_state:
+            move = self.strategy(state)
+        else:
+            move = self.strategy(state.to_game())
+        for name, value in self.search_metrics().items():
+            metrics[name] += value
+        return move
+
+    def search_deadline(self):
+        """
+        This method returns the time the strategy's search must stop by: the deadline of the move choose_move is
+        choosing, which is what is left of time_limit after the book and the endgame solver, or time_limit from
+        now if strategy was called by itself.
+        
+        Returns
+        -------
+        float: a time.perf_counter() value
+        """
+        if self.move_deadline is not None:
+            return self.move_deadline
+        return time.perf_counter() + self.time_limit
+
+    def prepare(self):
+        """
+        This method gets the strategy ready to choose moves, before the first move is asked for, so the time it
+        takes isn't taken from that move. A StrategyHost calls it in the worker before the worker reports it is
+        ready. Strategies with something slow to set up (like the helpers of ParallelNegamaxStrategy) override
+        it; the others have nothing to do.
+        """
+
+    def search_metrics(self):
+        """
+        This method reports what the last call of strategy did, for metrics. Strategies that search override
+        it; the others report nothing.
+        
+        Returns
+        -------
+        dict: any of nodes, depth and timeouts for the last call of strategy
+        """
+        return {}
+
+    def search_counters(self):
+        """
+        This method returns the strategy's running totals of transposition table probes. choose_move reads them
+        before and after each move, so they can be totals for the whole game (or anything else that only goes
+        up). Strategies with a table of their own add it to the endgame solver's.
+        
+        Returns
+        -------
+        dict: cache_hits and cache_misses so far
+        """
+        if self.endgame is None:
+            return {"cache_hits": 0, "cache_misses": 0}
+        return {"cache_hits": self.endgame.table.hits, "cache_misses": self.endgame.table.misses}
+
+    @staticmethod
+    def tactical_move(state):
+        """
+        This method finds a move that wins straight away, or else one that blocks the opponent from winning
+        with their next move.
+        
+        Parameters
+        ----------
+        state (object):
+                A GameState or Connect4Game.
+                
+        Returns
+        -------
+        int or None: the column, or None if there is no such move
+        """
+        wins, blocks, _ = tactics(state.bitboards, state.current_player)
+        if wins:
+            return mask_columns(wins)[0]
+        if blocks:
+            return mask_columns(blocks)[0]
+        return None
+
+    def candidate_moves(self, state):
+        """
+        This method lists the valid moves worth considering: all of them except the ones that leave the 
+        opponent a win in the cell right above. If every move does that, or the strategy isn't tactical, all
+        the valid moves are listed.
+        
+        Parameters
+        ----------
+        state (object):
+                A GameState or Connect4Game.
+                
+        Returns
+        -------
+        list: the columns, lowest first
+        """
+        bitboards = state.bitboards
+        playable = ((bitboards[0] | bitboards[1]) + BOTTOM_MASK) & BOARD_MASK
+        if self.tactical:
+            _, _, poisoned = tactics(bitboards, state.current_player)
+            if playable & ~poisoned:
+                playable &= ~poisoned
+        return mask_columns(playable)
+
 # this decorator indicates that this function is now useless but will be properly defined by a subclass.
     @abstractmethod
     def strategy(self, game_safety_copy):
@@ -28,10 +259,24 @@ class Connect4Game:
     checks for a winner by looking for four consecutive identical values in vertical, horizontal, and diagnol
     directions.
     
+    The board is stored as a bitboard: one integer per player in which every bit is a cell of the board.
+    Each column uses seven bits (six rows plus an empty spare bit on top), the lowest bit of a column being
+    its bottom row. A win is found by testing the few masks of the lines of four through the new piece against
+    the player's integer instead of walking the board cell by cell. The nested list board is still available as
+    a view for code that reads the board directly.
+    
     Instance Variables
     ------------------
+    self.bitboards: (list)
+                 Two integers holding the pieces of player 1 and player 2
+    self.heights: (list)
+                 The number of pieces in each of the seven columns
+    self.moves: (list)
+                 Stack of the columns played so far, last move at the end, used by unmake_move
+    self.ply: (int)
+                 The number of pieces on the board
     self.board: (Nested list)
-                 Game board of six rows and seven columns
+                 Game board of six rows and seven columns, built from the bitboards when it is read
     self.current_player (int)
                  An integer representing each of the players
     self.winner (None or int)
@@ -41,22 +286,57 @@ class Connect4Game:
     -------
     is_valid_move: Checks if move is valid or not
     
-    make_move: iterates through column to find first empty spot, checks for winner after each move,
+    make_move: places a piece in the lowest empty spot of a column, checks for winner after each move,
                and switches self.player to next player.
                
+    play_moves: makes a list of moves in one call, the same as make_move for each of them but faster.
+
+    unmake_move: takes back the last move made with make_move.
+    
+    clone: returns an independent copy of the game without the cost of copy.deepcopy.
+               
     check_for_winner: Evaluates a game state for game-winning patterns.
     
     check_line: Checks for similar values in a vertical, horizontal, or diagnol line.
     
     """
     def __init__(self):
-        # create game board as nested sublist. Game will have six rows and seven columns
-        self.board = [[0] * 7 for _ in range(6)]
+        # one integer per player holding that player's pieces. Player 1 is at index 0 and player 2 at index 1
+        self.bitboards = [0, 0]
+        # amount of pieces in each column, which is also the bit (from the bottom of the column) of the next free spot
+        self.heights = [0] * 7
+        # stack of the columns played so that moves can be taken back in the order they were made
+        self.moves = []
+        # number of moves made so far
+        self.ply = 0
         # set a specific player to go first, using number 1 as identifier
         self.current_player = 1
         # start off game with no winner yet
         self.winner = None
 
+    @property
+    def board(self):
+        """
+        Game board of six rows and seven columns as a nested list, with row 0 at the top of the board and 
+        0 for an empty spot. The list is built from the bitboards every time it is read so changing it 
+        does not change the game.
+        """
+        return board_view(self.bitboards)
+
+    @board.setter
+    def board(self, board):
+        # load a nested list board (top row first) into the bitboards and recount the pieces in each column.
+        # The order the pieces were played in is unknown so the move stack starts out empty.
+        self.bitboards = [0, 0]
+        self.heights = [0] * 7
+        self.moves = []
+        for row in range(6):
+            for col in range(7):
+                if board[row][col]:
+                    self.bitboards[board[row][col] - 1] |= cell_bit(row, col)
+                    self.heights[col] += 1
+        self.ply = sum(self.heights)
+
     def is_valid_move(self, column):
         """
         This method tests if a column provided is valid for a game move.
@@ -71,15 +351,8 @@ class Connect4Game:
         bool: False if column is out of bounds or if move cannot be done in column provided, 
               and True if move is valid.
         """
-        # check if column is valid  number. Since there are seven values in each sublist representing each column,
-        # the number must be less than seven and greater than or equal to zero reflecting the index range of the sublists.
-        if not (0 <= column < 7):
-        # return false for an invalid move
-            return False
-        # when column number is in appropriate range, return a boolean of true if the index of column in the first sublist is equal
-        # to zero which means that it is still unoccupied. This sublist is the top row of the game board so if the index of [0][column] 
-        # is equal to zero that column isn't full and can be used for moves. Returns false if the top row of index isn't equal zero.
-        return self.board[0][column] == 0
+        # the column number must be in the range of the seven columns, and the column must have less than six pieces in it
+        return 0 <= column < 7 and self.heights[column] < 6
 
     def make_move(self, column):
         """
@@ -94,29 +367,153 @@ class Connect4Game:
         -------
         Nothing, when move isn't valid because of winner, full column or because move has been made and funciton finishes.
         """
-        # test if move is valid with previous function or if there is already a winner.
-        if not self.is_valid_move(column) or self.winner is not None:
+        heights = self.heights
+        # test if move is valid (same test as is_valid_move, written out since this runs for every move) or if there is already a winner.
+        if self.winner is not None or not 0 <= column < 7 or heights[column] == 6:
         # quit function since move cannot be made due to finding winner or non valid column
             return
-        # otherwise meaning the column is valid and there is no winner yet
-        # loop through the rows of the provided column. Start from bottom of board which is index of five and decrese by one
-        # and go through zero which is top row. If no empty index is found in first round, loop will iterate until it finds
-        # empty index. We are guaranteed to find an empty index since is_valid_move returned True
-        for row in range(5, -1, -1):
-        # if bottom-most row is empty
-            if self.board[row][column] == 0:
-        # enter value of current player in that index as a move in the game
-                self.board[row][column] = self.current_player
-        # call check_winner function to check if the current move produces a win for current player
-                if self.check_winner(row, column):
-        # if it does declare current player as winner
-                    self.winner = self.current_player
-        # if game is still without a winner
-                else:
+        player = self.current_player
+        height = heights[column]
+        # the lowest empty spot of the column is the bit just above the pieces already in the column
+        pieces = self.bitboards[player - 1] | (1 << (column * COLUMN_BITS + height))
+        heights[column] = height + 1
+        self.bitboards[player - 1] = pieces
+        self.moves.append(column)
+        self.ply = ply = self.ply + 1
+        # only the player who just moved can have made a line of four, and only through the new piece. No one has
+        # four pieces before the seventh move, and a line needs a piece of the player next to the new one, so most
+        # moves are cleared by those two tests. The rest check the windows of four the new piece can complete
+        # (about five of them, see MOVE_WINDOWS).
+        if ply > 6 and pieces & MOVE_NEIGHBOURS[column][height]:
+            for window in MOVE_WINDOWS[column][height]:
+                if pieces & window == window:
+                    self.winner = player
+                    return
         # continue game and set self.current player to opponent. The number will be a 2. If opponent is moving the number will be one
-                    self.current_player = 3 - self.current_player
-        # once move was made and player switched to opponent the function ends
-                return
+        self.current_player = 3 - player
+
+    def play_moves(self, columns):
+        """
+        This method makes a list of moves one after the other, the same as calling make_move for each of them,
+        skipping the moves make_move would refuse. The game is kept in local variables for the whole list instead
+        of being read and written for every move, which makes replaying games (like the positions of a benchmark
+        or a game record) faster than one make_move call per move.
+        
+        Parameters
+        ----------
+        columns (iterable)
+                The columns of the moves, in the order to play them.
+        """
+        if self.winner is not None:
+            return
+        heights = self.heights
+        bitboards = self.bitboards
+        moves = self.moves
+        player = self.current_player
+        # the pieces of the player to move and of the other player, swapped after every move
+        pieces, other = bitboards[player - 1], bitboards[2 - player]
+        for column in columns:
+            if not 0 <= column < 7 or heights[column] == 6:
+                continue
+            height = heights[column]
+            heights[column] = height + 1
+            pieces |= 1 << (column * COLUMN_BITS + height)
+            moves.append(column)
+            # the same win check as make_move
+            if len(moves) > 6 and pieces & MOVE_NEIGHBOURS[column][height]:
+                for window in MOVE_WINDOWS[column][height]:
+                    if pieces & window == window:
+                        self.winner = player
+                        break
+                if self.winner is not None:
+                    # make_move would refuse the rest of the moves
+                    break
+            player = 3 - player
+            pieces, other = other, pieces
+        bitboards[player - 1] = pieces
+        bitboards[2 - player] = other
+        self.ply = len(moves)
+        self.current_player = player
+
+    def unmake_move(self):
+        """
+        This method takes back the last move made with make_move, including a win made by that move.
+        Search code can make and unmake moves on one game instead of copying the game for every move it tries.
+        
+        Returns
+        -------
+        int: the column of the move that was taken back
+        
+        Raises
+        ------
+        IndexError: if there is no move to take back
+        """
+        column = self.moves.pop()
+        self.heights[column] -= 1
+        bit = 1 << (column * COLUMN_BITS + self.heights[column])
+        # the top piece of the column belongs to the player who made the move, who is also the player to move again
+        player = 1 if self.bitboards[0] & bit else 2
+        self.bitboards[player - 1] ^= bit
+        self.ply -= 1
+        self.current_player = player
+        # no move can be made after a win, so the move taken back is the only one that could have won the game
+        self.winner = None
+        return column
+
+    def clone(self):
+        """
+        This method makes an independent copy of the game. Only the few lists of integers have to be copied,
+        which is much cheaper than copy.deepcopy.
+        
+        Returns
+        -------
+        Connect4Game: a new game in the same state as this one
+        """
+        game = Connect4Game.__new__(Connect4Game)
+        game.bitboards = self.bitboards[:]
+        game.heights = self.heights[:]
+        game.moves = self.moves[:]
+        game.ply = self.ply
+        game.current_player = self.current_player
+        game.winner = self.winner
+        return game
+
+    def state(self):
+        """
+        This method returns the current position as a read-only GameState. Only two integers are shared 
+        with the state, so this costs nothing compared to copying the game.
+        
+        Returns
+        -------
+        GameState: the current position
+        """
+        return GameState(tuple(self.bitboards), self.current_player, self.ply)
+
+    def key(self):
+        """
+        This method returns an integer that is different for every position, for use as a key in tables of 
+        positions. See position_key.
+        
+        Returns
+        -------
+        int: the key of the current position
+        """
+        return position_key(self.bitboards)
+
+    def canonical_key(self):
+        """
+        This method returns the key of the position or of its mirror image, whichever is smaller. See
+        canonical_key.
+        
+        Returns
+        -------
+        tuple: the canonical key, and True if it is the key of the mirror image
+        """
+        return canonical_key(position_key(self.bitboards))
+
+    # let copy.deepcopy of a game (or of anything holding a game) use the cheap copy as well
+    def __deepcopy__(self, memo):
+        return self.clone()
 
     def check_winner(self, row, col):
         """
@@ -133,22 +530,9 @@ class Connect4Game:
         -------
         bool: True for a win and False if no win is found
         """
-        # list of tuples containing all possibilities of offsetting values from the current index in order to identify wins. 
-        # first value in each tuple represents the offset of the row and the second for the column
-        # For example, the first tuple checks for a horizontal win since row has no offset while column is increasing. The last two
-        # tuples check for diagnol wins; the third checks to the right while the fourth cheks to the left.
-        # Althoug these offsetting directions only move in one direction, for example, the first tuple checks for a horizontal win
-        # only from left to right and the same issue exists for  the rest of the tuples, but since the check_line function subtracts three
-        # based on the values in the tuple we will always take into account all directions.  
+        # the four directions of a line of four: horizontal, vertical and the two diagnols
         directions = [(0, 1), (1, 0), (1, 1), (-1, 1)]
-        
-        # create a list of values returned from calling the check_line function using each tuple as a value for row and column offset.
-        # the row and column parameters are obtained from what was passed to the function
-        results = [self.check_line(row, col, dr, dc) for dr, dc in directions]
-        
-        # the list will be all false for no wins but will have one True if there is a win. The any function returns True if even
-        # one of its values are true. So if there is a win the function reuturns True.
-        return any(results)
+        return any(self.check_line(row, col, dr, dc) for dr, dc in directions)
 
     def check_line(self, row, col, dr, dc):
         """
@@ -168,31 +552,457 @@ class Connect4Game:
         -------
         bool: True if a consecutive line of four similar values are found and False if not.
         """
-        #  initialize  a counter to hold the amount of consecutive values
-        count = 0
-        # for each direction provided by the 'dr' and 'dc' we offset the index by three so we can address the issue of only going in one direction
-        # so if we are checking for consecutive horizontal values in a rightward direction we must move three steps backwards to account for the 
-        # possibility that the consecutive values are to the left. This allows the loop to check all possible four consecutive values from the current
-        # index while iterating seven times.
-        row = row - dr * 3
-        col = col - dc * 3
-        # iterate seven times corresponding the width of the gameboard
-        for _ in range(7):
-        # since row and col can sometimes be negative, for example, when the index of row or column are less than three, so funciton tests for the out 
-        # of range indexes. The second half of the condition is the actual test, which is if the original or new index that is now one step closer also
-        #  has the same value as the step before it
-            if 0 <= row < 6 and 0 <= col < 7 and self.board[row][col] == self.current_player:
-        #  for each same value add one to the counter 
-                count += 1
-        # when four same values are recorded
-                if count == 4:
-        # functions returns true and loop stops even before seven iterations
-                    return True
-        # if any of the iterations yeild an index out of range or an opponents value, the count reverts back to zero
-            else:
-                count = 0
-        # each iteration adds one (or zero which does nothing) to the index to explore the complete possible winning direction.
-            row += dr
-            col += dc
-        # if after seven iterations four consecutive same values have not been found
+        pieces = self.bitboards[self.current_player - 1]
+        # only the windows of four through the cell in this direction can hold the line, at most four of them
+        for window in CELL_WINDOWS[row][col][DIRECTION_INDEX[dr, dc]]:
+            if pieces & WINDOW_MASKS[window] == WINDOW_MASKS[window]:
+                return True
         return False
+
+
+class GameState:
+    """
+    This class is a read-only snapshot of a position: the two bitboards, the player to move and the number of
+    moves made. It can't be changed after it is created, and two states of the same position are equal and 
+    have the same hash, so a state can be used directly as a dictionary key. It has the same is_valid_move, 
+    board, current_player and winner as Connect4Game, so strategies that only read the game can use it as is.
+    
+    Instance Variables
+    ------------------
+    self.bitboards: (tuple)
+                 Two integers holding the pieces of player 1 and player 2
+    self.current_player (int)
+                 The player to move
+    self.move_count (int)
+                 The number of moves made so far
+                 
+    Methods
+    -------
+    is_valid_move: Checks if move is valid or not
+    
+    to_game: Returns a Connect4Game in this position to make moves on.
+    
+    """
+    __slots__ = ("bitboards", "current_player", "move_count")
+
+    def __init__(self, bitboards, current_player, move_count):
+        # the attributes are set through object since setting them on the state itself is blocked
+        object.__setattr__(self, "bitboards", bitboards)
+        object.__setattr__(self, "current_player", current_player)
+        object.__setattr__(self, "move_count", move_count)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameState is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("GameState is read-only")
+
+    def __eq__(self, other):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return self.bitboards == other.bitboards and self.current_player == other.current_player
+
+    def __hash__(self):
+        return hash((self.bitboards, self.current_player))
+
+    def __repr__(self):
+        return f"GameState({self.bitboards!r}, {self.current_player!r}, {self.move_count!r})"
+
+    # states are never changed, so a copy can be the state itself
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (GameState, (self.bitboards, self.current_player, self.move_count))
+
+    @property
+    def board(self):
+        """
+        Game board of six rows and seven columns as a nested list, built when it is read as for Connect4Game.
+        """
+        return board_view(self.bitboards)
+
+    @property
+    def winner(self):
+        """
+        The number of the player with a line of four, or None if no player has won.
+        """
+        for player in (1, 2):
+            if has_four(self.bitboards[player - 1]):
+                return player
+        return None
+
+    def is_valid_move(self, column):
+        """
+        This method tests if a column provided is valid for a game move.
+        
+        Parameters
+        ----------
+        column (int)
+                The column number of the requested next move.
+                
+        Returns
+        -------
+        bool: True if the column is on the board and its top spot is empty, and False if not.
+        """
+        return 0 <= column < 7 and not (self.bitboards[0] | self.bitboards[1]) & (1 << (column * COLUMN_BITS + 5))
+
+    def key(self):
+        """
+        This method returns the same integer key as Connect4Game.key for this position.
+        
+        Returns
+        -------
+        int: the key of the position
+        """
+        return position_key(self.bitboards)
+
+    def canonical_key(self):
+        """
+        This method returns the same canonical key as Connect4Game.canonical_key for this position.
+        
+        Returns
+        -------
+        tuple: the canonical key, and True if it is the key of the mirror image
+        """
+        return canonical_key(position_key(self.bitboards))
+
+    def to_game(self):
+        """
+        This method builds a Connect4Game in this position. The game has no move stack for the moves that led
+        to the position, but moves made on it can be taken back with unmake_move.
+        
+        Returns
+        -------
+        Connect4Game: a new game in this position
+        """
+        game = Connect4Game()
+        game.bitboards = list(self.bitboards)
+        occupied = self.bitboards[0] | self.bitboards[1]
+        # the pieces of a column fill it from the bottom bit up, so the bit length of the column is its height
+        game.heights = [((occupied >> (col * COLUMN_BITS)) & 0x7f).bit_length() for col in range(7)]
+        game.ply = self.move_count
+        game.current_player = self.current_player
+        game.winner = self.winner
+        return game
+
+
+def position_key(bitboards):
+    """
+    This function packs a position into a single integer which is different for every position. Adding the
+    occupied cells to player 1's cells makes each column a number that can only come from one arrangement of
+    pieces in that column, and the number never carries into the next column. The player to move is not 
+    needed, as it follows from the number of pieces on the board.
+    
+    Parameters
+    ----------
+    bitboards (list or tuple)
+            The bitboards of player 1 and player 2.
+            
+    Returns
+    -------
+    int: the key of the position
+    """
+    return bitboards[0] + (bitboards[0] | bitboards[1])
+
+
+def mirror_key(key):
+    """
+    This function returns the key of the mirror image of a position, with column 0 swapped with column 6 and
+    so on. Each column of a key takes up its own seven bits, so the columns can be moved around whole.
+    Keys made the same way from other bitboards (like the player to move's pieces plus the occupied cells) can
+    be mirrored too.
+    
+    Parameters
+    ----------
+    key (int)
+            The key of a position, from position_key.
+            
+    Returns
+    -------
+    int: the key of the mirrored position
+    """
+    # columns 0, 1 and 2 move up by 6, 4 and 2 columns, columns 4, 5 and 6 down by the same, and 3 stays
+    return (((key & _MIRROR_MASKS[0]) << 42) | ((key & _MIRROR_MASKS[1]) << 28) | ((key & _MIRROR_MASKS[2]) << 14)
+            | (key & _MIRROR_MASKS[3])
+            | ((key >> 14) & _MIRROR_MASKS[2]) | ((key >> 28) & _MIRROR_MASKS[1]) | ((key >> 42) & _MIRROR_MASKS[0]))
+
+
+def canonical_key(key):
+    """
+    This function picks one key for a position and its mirror image, which have the same value, so a table 
+    keyed by it only needs one entry for the two of them. Moves stored with a mirrored key are moves of the 
+    mirror image, and have to be mapped back with mirror_move.
+    
+    Parameters
+    ----------
+    key (int)
+            The key of a position, from position_key.
+            
+    Returns
+    -------
+    tuple: the smaller of the key and its mirrored key, and True if it is the mirrored key
+    """
+    mirrored = mirror_key(key)
+    if mirrored < key:
+        return mirrored, True
+    return key, False
+
+
+def mirror_move(column, mirrored=True):
+    """
+    This function maps a column between a position and its mirror image.
+    
+    Parameters
+    ----------
+    column (int or None)
+            The column.
+    mirrored (bool)
+            False to leave the column as it is, for keys that weren't mirrored.
+            
+    Returns
+    -------
+    int or None: the column in the other position
+    """
+    if column is None or not mirrored:
+        return column
+    return 6 - column
+
+
+def board_view(bitboards):
+    """
+    This function builds a nested list board from the two bitboards of a position.
+    
+    Parameters
+    ----------
+    bitboards (list or tuple)
+            The bitboards of player 1 and player 2.
+            
+    Returns
+    -------
+    list: six rows of seven values, row 0 at the top, with 0 for an empty spot or the number of the player
+    """
+    first, second = bitboards
+    board = [[0] * 7 for _ in range(6)]
+    for row in range(6):
+        for col in range(7):
+            bit = cell_bit(row, col)
+            if first & bit:
+                board[row][col] = 1
+            elif second & bit:
+                board[row][col] = 2
+    return board
+
+
+def cell_bit(row, col):
+    """
+    This function returns the bit of a board cell on the bitboard.
+    
+    Parameters
+    ----------
+    row (int)
+            The row of the cell, with row 0 at the top of the board.
+    col (int)
+            The column of the cell.
+            
+    Returns
+    -------
+    int: an integer with only the bit of the cell set
+    """
+    return 1 << (col * COLUMN_BITS + 5 - row)
+
+
+def count_bits(bitboard):
+    """
+    This function counts the set bits of a bitboard, like the pieces in it.
+    
+    Parameters
+    ----------
+    bitboard (int)
+            The bitboard.
+            
+    Returns
+    -------
+    int: the number of bits set
+    """
+    return bin(bitboard).count("1")
+
+
+# int.bit_count does the same much faster, but only from Python 3.10, and the project still runs on 3.8
+if hasattr(int, "bit_count"):
+    count_bits = int.bit_count
+
+
+def has_four(pieces):
+    """
+    This function checks if a player's bitboard contains a line of four anywhere on the board.
+    
+    Parameters
+    ----------
+    pieces (int)
+            The bitboard of one player.
+            
+    Returns
+    -------
+    bool: True if there is a line of four and False if not
+    """
+    # for each direction, AND the board with itself shifted by one cell to find pairs, then AND the pairs 
+    # with themselves shifted by two cells to find lines of four. The shifts are 1 for vertical, 7 for horizontal
+    # and 6 and 8 for the two diagnols. The spare bit on top of each column is always empty so a line can never
+    # wrap around from one column to the next.
+    pairs = pieces & (pieces >> 1)
+    if pairs & (pairs >> 2):
+        return True
+    pairs = pieces & (pieces >> 7)
+    if pairs & (pairs >> 14):
+        return True
+    pairs = pieces & (pieces >> 6)
+    if pairs & (pairs >> 12):
+        return True
+    pairs = pieces & (pieces >> 8)
+    return bool(pairs & (pairs >> 16))
+
+
+def winning_cells(pieces, occupied):
+    """
+    This function finds the empty cells that would complete a line of four for a player, whether they can be
+    played now or not.
+
+    Parameters
+    ----------
+    pieces (int)
+            The bitboard of the player.
+    occupied (int)
+            The bitboard of all the pieces on the board.
+
+    Returns
+    -------
+    int: a bitboard of the cells
+    """
+    # vertical: the three cells below are the player's
+    cells = (pieces << 1) & (pieces << 2) & (pieces << 3)
+    # the other directions: the cell can be at either end of a line of three, or fill a gap in the middle of one.
+    # The shifts are 7 for horizontal and 6 and 8 for the two diagnols.
+    for shift in (COLUMN_BITS, COLUMN_BITS - 1, COLUMN_BITS + 1):
+        pairs = (pieces << shift) & (pieces << 2 * shift)
+        cells |= pairs & (pieces << 3 * shift)
+        cells |= pairs & (pieces >> shift)
+        pairs = (pieces >> shift) & (pieces >> 2 * shift)
+        cells |= pairs & (pieces << shift)
+        cells |= pairs & (pieces >> 3 * shift)
+    return cells & (BOARD_MASK ^ occupied)
+
+
+def tactics(bitboards, player):
+    """
+    This function finds the three kinds of moves that decide a position before any scoring: moves that win,
+    moves that stop the opponent from winning next move, and moves that are poisoned because the opponent
+    could win by playing on top of them.
+    
+    Parameters
+    ----------
+    bitboards (list or tuple)
+            The bitboards of player 1 and player 2.
+    player (int)
+            The player to move.
+            
+    Returns
+    -------
+    tuple: bitboards of the cells of the winning, blocking and poisoned moves
+    """
+    occupied = bitboards[0] | bitboards[1]
+    playable = (occupied + BOTTOM_MASK) & BOARD_MASK
+    threats = winning_cells(bitboards[2 - player], occupied)
+    wins = winning_cells(bitboards[player - 1], occupied) & playable
+    # a cell is poisoned when the cell above it would win for the opponent
+    return wins, threats & playable, (threats >> 1) & playable
+
+
+def mask_columns(mask):
+    """
+    This function lists the columns that have a cell in a bitboard.
+    
+    Parameters
+    ----------
+    mask (int)
+            The bitboard.
+            
+    Returns
+    -------
+    list: the columns, lowest first
+    """
+    return [col for col in range(7) if mask >> (col * COLUMN_BITS) & COLUMN_MASK]
+
+
+# the four directions of a line as (row step, column step): horizontal, vertical and the two diagnols
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (-1, 1)]
+# position in DIRECTIONS of each direction, for a step either way along the line
+DIRECTION_INDEX = {step: index for index, (dr, dc) in enumerate(DIRECTIONS) for step in ((dr, dc), (-dr, -dc))}
+
+
+def _on_board(row, col):
+    return 0 <= row < 6 and 0 <= col < 7
+
+
+def _build_windows():
+    """
+    This function lists every window of four cells in a row on the board, and for each cell the windows through
+    it and the cells around it in each direction. It is run once when the module is imported, so the rules and the strategies can look windows up instead
+    of walking the board and testing its edges on every move.
+    
+    Returns
+    -------
+    tuple: the lists WINDOWS, WINDOW_DIRECTIONS, WINDOW_MASKS, CELL_WINDOWS, CELL_RAYS and CELL_FLANKS
+    """
+    windows, window_directions, window_masks = [], [], []
+    # CELL_WINDOWS[row][col][direction]: numbers of the windows through the cell in that direction
+    cell_windows = [[[[] for _ in DIRECTIONS] for _ in range(7)] for _ in range(6)]
+    for row in range(6):
+        for col in range(7):
+            for direction, (dr, dc) in enumerate(DIRECTIONS):
+                cells = tuple((row + k * dr, col + k * dc) for k in range(4))
+                # only keep windows whose last cell is still on the board
+                if not _on_board(*cells[3]):
+                    continue
+                for cell_row, cell_col in cells:
+                    cell_windows[cell_row][cell_col][direction].append(len(windows))
+                windows.append(cells)
+                window_directions.append(direction)
+                window_masks.append(sum(cell_bit(*cell) for cell in cells))
+
+    # CELL_RAYS[row][col][direction]: the cells on the board up to three steps from the cell in that direction, as a
+    # tuple of the cells ahead of it and a tuple of the cells behind it, nearest first. These are all the cells a line
+    # of up to four through the cell can use.
+    cell_rays = [[[None] * len(DIRECTIONS) for _ in range(7)] for _ in range(6)]
+    # CELL_FLANKS[row][col][direction]: the cells two steps ahead of and two steps behind the cell, or None where
+    # that is off the board
+    cell_flanks = [[[None] * len(DIRECTIONS) for _ in range(7)] for _ in range(6)]
+    for row in range(6):
+        for col in range(7):
+            for direction, (dr, dc) in enumerate(DIRECTIONS):
+                ahead = tuple((row + k * dr, col + k * dc) for k in range(1, 4) if _on_board(row + k * dr, col + k * dc))
+                behind = tuple((row - k * dr, col - k * dc) for k in range(1, 4) if _on_board(row - k * dr, col - k * dc))
+                cell_rays[row][col][direction] = (ahead, behind)
+                flanks = ((row + 2 * dr, col + 2 * dc), (row - 2 * dr, col - 2 * dc))
+                cell_flanks[row][col][direction] = tuple(cell if _on_board(*cell) else None for cell in flanks)
+            cell_windows[row][col] = [tuple(numbers) for numbers in cell_windows[row][col]]
+    return windows, window_directions, window_masks, cell_windows, cell_rays, cell_flanks
+
+
+# the 69 windows of four cells in a row, the direction and bitboard mask of each, and the index from cells to them
+WINDOWS, WINDOW_DIRECTIONS, WINDOW_MASKS, CELL_WINDOWS, CELL_RAYS, CELL_FLANKS = _build_windows()
+
+# MOVE_WINDOWS[col][height]: the masks of the windows a piece dropped into the column at that height can complete.
+# The cells above the piece are still empty, so the only vertical window kept is the one the piece is the top of.
+MOVE_WINDOWS = [[tuple(WINDOW_MASKS[window] for window in sum(CELL_WINDOWS[5 - height][col], ())
+                       if not (WINDOW_MASKS[window] >> (col * COLUMN_BITS) & COLUMN_MASK) >> (height + 1))
+                 for height in range(6)] for col in range(7)]
+
+# MOVE_NEIGHBOURS[col][height]: the cells next to a piece dropped into the column at that height, in any of the
+# directions a line can take (the cell above is still empty). A line of four through the piece needs one of them.
+MOVE_NEIGHBOURS = [[sum(cell_bit(5 - height + dr, col + dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+                        if (dr, dc) != (0, 0) and _on_board(5 - height + dr, col + dc))
+                    for height in range(6)] for col in range(7)]
@@ -0,0 +1,247 @@
+import time
+import Connect4Game as Game
+import Transposition_table as TT
+
+# the scores of the solver count how early the game is won: a win with the player's n-th piece scores
+# 22 - n (the quickest possible win, with the 4th piece, is 18), a loss to the opponent's n-th piece scores
+# n - 22 and a tie scores 0. Scores are for the player to move.
+
+# columns from the middle outwards, the order moves of equal promise are searched in
+MOVE_ORDER = [3, 2, 4, 1, 5, 0, 6]
+
+# the cells of each column, to pick a column's move out of a bitboard of moves
+COLUMN_MASKS = [0b111111 << (col * Game.COLUMN_BITS) for col in range(7)]
+
+# the clock is looked at once every this many positions, as in NegamaxStrategy
+CLOCK_CHECK_MASK = 1023
+
+
+class EndgameSolver:
+    """
+    This class plays perfectly once few empty cells are left. It searches the game right to the end, so the
+    result it finds (win, loss or tie, and how soon) is certain, unlike the scores of the other strategies that
+    stop searching after a number of moves and guess.
+
+    The search works on the bitboards of the player to move and of all the pieces, and keeps results in a
+    transposition table. Instead of searching once with every score possible, it asks a series of yes-or-no
+    questions ("is the score above x?") with searches whose window is a single score wide (null-window), which
+    cut off far more moves, and narrows down the score from their answers. Moves that let the opponent win
+    straight away are never searched, and moves that make the most new threats are searched first.
+
+    Instance Variables
+    ------------------
+    self.threshold: (int)
+                 The largest number of empty cells the solver is used for
+    self.time_limit: (float or None)
+                 Seconds a solve may take before it is given up, or None for no limit
+    self.table: (TranspositionTable)
+                 The results of positions already solved, kept between moves
+    self.nodes: (int)
+                 Number of positions searched for the last solve
+
+    Methods
+    -------
+    applies: Tells if a position has few enough empty cells to be solved.
+
+    solve: Finds the exact score of a position.
+
+    best_move: Finds a move that gets the exact score of a position.
+
+    """
+    def __init__(self, threshold=18, time_limit=0.5, table=None):
+        self.threshold = threshold
+        self.time_limit = time_limit
+        self.table = TT.TranspositionTable(4) if table is None else table
+        self.nodes = 0
+        self.deadline = None
+
+    def applies(self, state):
+        """
+        This method tells if a position has few enough empty cells to be solved.
+
+        Parameters
+        ----------
+        state (object):
+                A GameState or Connect4Game.
+
+        Returns
+        -------
+        bool: True if the position should be solved
+        """
+        bitboards = state.bitboards
+        return 42 - Game.count_bits(bitboards[0] | bitboards[1]) <= self.threshold
+
+    def _deadline(self, deadline):
+        # the earlier of the deadline given and the end of the solver's own time limit
+        if self.time_limit is not None:
+            own = time.perf_counter() + self.time_limit
+            deadline = own if deadline is None else min(deadline, own)
+        return deadline
+
+    def solve(self, state, deadline=None):
+        """
+        This method finds the exact score of a position for the player to move.
+
+        Parameters
+        ----------
+        state (object):
+                A GameState or Connect4Game with no winner yet.
+        deadline (float or None):
+                A time.perf_counter() value to give up by, if that is sooner than the time limit.
+
+        Returns
+        -------
+        int or None: the score, or None if the time limit passed first
+        """
+        self.nodes = 0
+        self.deadline = self._deadline(deadline)
+        bitboards = state.bitboards
+        player = bitboards[state.current_player - 1]
+        occupied = bitboards[0] | bitboards[1]
+        try:
+            return self.score(player, occupied, Game.count_bits(occupied))
+        except Game.SearchTimeout:
+            return None
+        finally:
+            self.deadline = None
+
+    def best_move(self, state, deadline=None):
+        """
+        This method finds a move that gets the exact score of a position.
+
+        Parameters
+        ----------
+        state (object):
+                A GameState or Connect4Game with no winner yet.
+        deadline (float or None):
+                A time.perf_counter() value to give up by, if that is sooner than the time limit.
+
+        Returns
+        -------
+        tuple or None: the column and the score, or None if the time limit passed first
+        """
+        self.nodes = 0
+        self.deadline = self._deadline(deadline)
+        bitboards = state.bitboards
+        player = bitboards[state.current_player - 1]
+        occupied = bitboards[0] | bitboards[1]
+        moves = Game.count_bits(occupied)
+        playable = (occupied + Game.BOTTOM_MASK) & Game.BOARD_MASK
+        try:
+            target = self.score(player, occupied, moves)
+            # the move that reaches the score is found with one null-window search per move, most of which
+            # are answered by the table filled in while the score was found
+            for col in MOVE_ORDER:
+                move = playable & COLUMN_MASKS[col]
+                if not move:
+                    continue
+                if Game.has_four(player | move):
+                    return col, target
+                opponent = player ^ occupied
+                if Game.winning_cells(opponent, occupied | move) & ((occupied | move) + Game.BOTTOM_MASK):
+                    # the opponent would win straight away
+                    continue
+                if -self.negamax(opponent, occupied | move, moves + 1, -target, -target + 1) >= target:
+                    return col, target
+            # every move loses at once, so any of them will do
+            col = next(col for col in MOVE_ORDER if playable & COLUMN_MASKS[col])
+            return col, target
+        except Game.SearchTimeout:
+            return None
+        finally:
+            self.deadline = None
+
+    def score(self, player, occupied, moves):
+        # find the exact score by narrowing its range with null-window searches, trying 0 and the middle of the
+        # winning or losing half first since most positions are ties or close to them
+        playable = (occupied + Game.BOTTOM_MASK) & Game.BOARD_MASK
+        if Game.winning_cells(player, occupied) & playable:
+            return (43 - moves) // 2
+        low = -((42 - moves) // 2)
+        high = (43 - moves) // 2
+        while low < high:
+            middle = low + (high - low) // 2
+            if middle <= 0 and int(low / 2) < middle:
+                middle = int(low / 2)
+            elif middle >= 0 and int(high / 2) > middle:
+                middle = int(high / 2)
+            result = self.negamax(player, occupied, moves, middle, middle + 1)
+            if result <= middle:
+                high = result
+            else:
+                low = result
+        return low
+
+    def negamax(self, player, occupied, moves, alpha, beta):
+        """
+        This method searches a position to the end of the game with alpha-beta pruning.
+
+        Parameters
+        ----------
+        player (int):
+                The bitboard of the player to move, who can't win with this move.
+        occupied (int):
+                The bitboard of all the pieces.
+        moves (int):
+                The number of pieces on the board.
+        alpha, beta (int):
+                The window of scores that matter.
+
+        Returns
+        -------
+        int: the score, exact if it falls inside the window, otherwise a bound on the side it fell
+        """
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & CLOCK_CHECK_MASK and time.perf_counter() > self.deadline:
+            raise Game.SearchTimeout
+        playable = (occupied + Game.BOTTOM_MASK) & Game.BOARD_MASK
+        opponent = player ^ occupied
+        threats = Game.winning_cells(opponent, occupied)
+        forced = playable & threats
+        if forced:
+            if forced & (forced - 1):
+                # two threats of the opponent can't both be blocked
+                return -((42 - moves) // 2)
+            playable = forced
+        # a move right under a threat of the opponent lets the opponent win on top of it
+        safe = playable & ~(threats >> 1)
+        if not safe:
+            return -((42 - moves) // 2)
+        if moves >= 40:
+            return 0
+        # neither player can win sooner than the next moves allow
+        lowest = -((40 - moves) // 2)
+        if alpha < lowest:
+            alpha = lowest
+            if alpha >= beta:
+                return alpha
+        highest = (41 - moves) // 2
+        # a position and its mirror image have the same score, so they share an entry
+        key = player + occupied
+        key = min(key, Game.mirror_key(key))
+        entry = self.table.probe(key)
+        if entry is not None:
+            if entry[2] == TT.UPPER_BOUND:
+                highest = min(highest, entry[3])
+            else:
+                alpha = max(alpha, entry[3])
+        if beta > highest:
+            beta = highest
+        if alpha >= beta:
+            return beta if entry is None or entry[2] == TT.UPPER_BOUND else alpha
+        # search the moves that make the most threats of our own first
+        ordered = []
+        for col in MOVE_ORDER:
+            move = safe & COLUMN_MASKS[col]
+            if move:
+                ordered.append((-Game.count_bits(Game.winning_cells(player | move, occupied)), len(ordered), move))
+        ordered.sort()
+        for _, _, move in ordered:
+            score = -self.negamax(opponent, occupied | move, moves + 1, -beta, -alpha)
+            if score >= beta:
+                self.table.store(key, 42 - moves, TT.LOWER_BOUND, score, None)
+                return score
+            if score > alpha:
+                alpha = score
+        self.table.store(key, 42 - moves, TT.UPPER_BOUND, alpha, None)
+        return alpha
@@ -0,0 +1,210 @@
+import Connect4Game as Game
+
+# the scores used by AI_strategy for lines of three and two. Here they are given for every window of four cells
+# that holds three (or two) pieces of one player and no pieces of the other, so the line can still become a four.
+THREE_SCORE = 3000
+TWO_SCORE = 1000
+# bonus for each piece in the middle column, which is part of more lines of four than any other column
+CENTER_SCORE = 50
+CENTER_MASK = sum(Game.cell_bit(row, 3) for row in range(6))
+
+# WINDOWS_AT[bit]: numbers of all the windows through the cell of that bit position of a bitboard
+WINDOWS_AT = [()] * (7 * Game.COLUMN_BITS)
+for _row in range(6):
+    for _col in range(7):
+        WINDOWS_AT[Game.cell_bit(_row, _col).bit_length() - 1] = sum(Game.CELL_WINDOWS[_row][_col], ())
+
+
+class IncrementalEvaluation:
+    """
+    This class keeps count of the pieces of each player in every window of four cells while moves are made and
+    taken back, so the lines of two and three that AI_strategy scores are known at any time without looking at
+    the board. A move only changes the windows through its cell, at most 16 of them.
+
+    Moves must be made and taken back through this class instead of on the game directly, so that the counts
+    follow the game.
+
+    Instance Variables
+    ------------------
+    self.game: (object)
+                 The Connect4Game being followed
+    self.counts: (list)
+                 For each player, the number of that player's pieces in each window
+    self.open: (list)
+                 For each player, open[k] is the number of windows with k pieces of the player and none of the other
+    self.threats: (list)
+                 For each player, a bitboard of the empty cells that would complete a line of four for the player
+
+    Methods
+    -------
+    make_move: Makes a move on the game and updates the counts.
+
+    unmake_move: Takes back the last move and updates the counts.
+
+    open_lines: Number of lines of a given size a player can still make a four from.
+
+    winning_moves: Bitboard of the cells a player can play now to win.
+
+    score: Scores the position for the player to move.
+
+    """
+    def __init__(self, game):
+        self.game = game
+        self.counts = [[0] * len(Game.WINDOWS), [0] * len(Game.WINDOWS)]
+        self.open = [[len(Game.WINDOWS), 0, 0, 0, 0], [len(Game.WINDOWS), 0, 0, 0, 0]]
+        self.threats = [0, 0]
+        # how many windows make each cell a threat for each player, by bit position
+        self.threat_counts = [[0] * len(WINDOWS_AT), [0] * len(WINDOWS_AT)]
+        # count the pieces already on the board one at a time, as if they were being played. The order doesn't
+        # change the counts, as long as each piece is added to a bitboard of the pieces counted so far.
+        for player in (1, 2):
+            pieces = game.bitboards[player - 1]
+            added = 0
+            while pieces:
+                bit = pieces & -pieces
+                added |= bit
+                self._add(player, bit, added)
+                pieces ^= bit
+
+    def make_move(self, column):
+        """
+        This method makes a move on the game, as Connect4Game.make_move does, and updates the counts.
+
+        Parameters
+        ----------
+        column (int)
+                The column number of the move.
+        """
+        game = self.game
+        if game.winner is not None or not game.is_valid_move(column):
+            return
+        player = game.current_player
+        bit = 1 << (column * Game.COLUMN_BITS + game.heights[column])
+        game.make_move(column)
+        self._add(player, bit, game.bitboards[player - 1])
+
+    def unmake_move(self):
+        """
+        This method takes back the last move, as Connect4Game.unmake_move does, and updates the counts.
+
+        Returns
+        -------
+        int: the column of the move that was taken back
+        """
+        game = self.game
+        column = game.moves[-1]
+        bit = 1 << (column * Game.COLUMN_BITS + game.heights[column] - 1)
+        # the counts are updated while the piece is still on the board, the same as when it was added
+        player = 1 if game.bitboards[0] & bit else 2
+        self._remove(player, bit, game.bitboards[player - 1])
+        return game.unmake_move()
+
+    def _add(self, player, bit, pieces):
+        # count a new piece of the player at bit. pieces is the player's bitboard with the new piece on it.
+        mine, theirs = self.counts[player - 1], self.counts[2 - player]
+        open_mine, open_theirs = self.open[player - 1], self.open[2 - player]
+        for window in WINDOWS_AT[bit.bit_length() - 1]:
+            count = mine[window]
+            other = theirs[window]
+            if other == 0:
+                # the window moves up one count for this player
+                open_mine[count] -= 1
+                open_mine[count + 1] += 1
+                if count == 2:
+                    # a new line of three, and the one empty cell left in the window would make it four
+                    self._add_threat(player, Game.WINDOW_MASKS[window] & ~pieces)
+                elif count == 3:
+                    self._remove_threat(player, bit)
+            if count == 0:
+                # the window can't become a four for the other player anymore
+                open_theirs[other] -= 1
+                if other == 3:
+                    self._remove_threat(3 - player, bit)
+            mine[window] = count + 1
+
+    def _remove(self, player, bit, pieces):
+        # take back the piece of the player at bit. pieces is the player's bitboard with the piece still on it.
+        mine, theirs = self.counts[player - 1], self.counts[2 - player]
+        open_mine, open_theirs = self.open[player - 1], self.open[2 - player]
+        for window in WINDOWS_AT[bit.bit_length() - 1]:
+            count = mine[window] - 1
+            other = theirs[window]
+            if other == 0:
+                open_mine[count + 1] -= 1
+                open_mine[count] += 1
+                if count == 2:
+                    self._remove_threat(player, Game.WINDOW_MASKS[window] & ~pieces)
+                elif count == 3:
+                    self._add_threat(player, bit)
+            if count == 0:
+                open_theirs[other] += 1
+                if other == 3:
+                    self._add_threat(3 - player, bit)
+            mine[window] = count
+
+    def _add_threat(self, player, bit):
+        counts = self.threat_counts[player - 1]
+        index = bit.bit_length() - 1
+        counts[index] += 1
+        if counts[index] == 1:
+            self.threats[player - 1] |= bit
+
+    def _remove_threat(self, player, bit):
+        counts = self.threat_counts[player - 1]
+        index = bit.bit_length() - 1
+        counts[index] -= 1
+        if counts[index] == 0:
+            self.threats[player - 1] &= ~bit
+
+    def open_lines(self, player, size):
+        """
+        This method returns the number of windows holding a given number of pieces of a player and none of the
+        other player, i.e. lines of that size that can still become a four.
+
+        Parameters
+        ----------
+        player (int)
+                The number of the player.
+        size (int)
+                The number of pieces in the window, 0 to 4.
+
+        Returns
+        -------
+        int: the number of such windows
+        """
+        return self.open[player - 1][size]
+
+    def winning_moves(self, player):
+        """
+        This method finds the cells a player can play right now to make a line of four. For the player to move
+        these are the winning moves, and for the other player they are the moves that have to be blocked.
+
+        Parameters
+        ----------
+        player (int)
+                The number of the player.
+
+        Returns
+        -------
+        int: a bitboard of the cells
+        """
+        bitboards = self.game.bitboards
+        # adding the bottom of every column to the occupied cells carries into the lowest empty cell of each column
+        playable = ((bitboards[0] | bitboards[1]) + Game.BOTTOM_MASK) & Game.BOARD_MASK
+        return self.threats[player - 1] & playable
+
+    def score(self):
+        """
+        This method scores the position for the player to move the same way as NegamaxStrategy.evaluate, from the
+        counts instead of from the board.
+
+        Returns
+        -------
+        int: the score of the position for the player to move
+        """
+        game = self.game
+        me = game.current_player - 1
+        own, other = self.open[me], self.open[1 - me]
+        center = (Game.count_bits(game.bitboards[me] & CENTER_MASK)
+                  - Game.count_bits(game.bitboards[1 - me] & CENTER_MASK))
+        return THREE_SCORE * (own[3] - other[3]) + TWO_SCORE * (own[2] - other[2]) + CENTER_SCORE * center
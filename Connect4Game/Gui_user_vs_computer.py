@@ -1,14 +1,21 @@
 import tkinter as tk
 import Connect4Game as game
 from tkinter import messagebox
-import copy
 #import s as s 
 #import y as y
 #import mx as mx
-import YosefBirnbaumAI as ai
-import ii as i
+#import AI_player as ai
+import Negamax_player as negamax
+import queue
+import threading
 import time  
 
+# milliseconds between checks for the computer's move
+POLL_INTERVAL = 20
+
+# the color of the disc in a box: white for an empty box, red for player 1 and yellow for player 2
+COLORS = {0: "white", 1: "red", 2: "yellow"}
+
 
 class Connect4GUI:
     def __init__(self, master):
@@ -18,8 +25,15 @@ class Connect4GUI:
         #self.s = s.MinimaxStrategy()
         #self.y = y.YosefBirnbaum(self.game)
         #self.mx = mx.MinimaxStrategy()
-        self.ai = ai.AI_strategy(self.game)
-        self.i = i.AI_strategy(self.game)
+        #self.ai = ai.AI_strategy()
+        # the computer searches while the user is thinking (pondering) and keeps what it found for its own move
+        self.ai = negamax.NegamaxStrategy(depth=12, time_limit=2)
+        self.ponder_thread = None
+        # the event that stops the running ponder. Each ponder gets a new one, so stopping one never stops the next.
+        self.ponder_stop = None
+        # the computer searches on a worker thread and puts its move here, so the window keeps responding
+        self.computer_moves = queue.Queue()
+        self.thinking = False
         self.buttons = []
         for col in range(7):
             button = tk.Button(master, text=str(col + 1), command=lambda c=col: self.make_move(c))
@@ -28,11 +42,14 @@ class Connect4GUI:
 
         self.canvas = tk.Canvas(master, width=7 * 60, height=6 * 60)
         self.canvas.grid(row=1, column=0, columnspan=7)
+        # canvas item id of the disc in each box, so a move only recolors one disc
+        self.discs = []
+        self.create_board()
         self.draw_board()
+        self.start_pondering()
         ''' 
         # Computer makes the first move
-        game_safety_copy = copy.deepcopy(self.game)
-        computer_move = self.ai.strategy(game_safety_copy)
+        computer_move = self.ai.choose_move(self.game.state())
         self.game.make_move(computer_move)
         self.draw_board()
         '''
@@ -40,52 +57,127 @@ class Connect4GUI:
         #print('player should be 1.')
         #print(self.game.current_player)
         #print(self.y.evaluate(self.game))
+        if self.thinking:
+            return
+        self.stop_pondering()
         self.game.make_move(column)
         #print('player should be 2.')
         #print(self.game.current_player)
+        self.draw_move()
+        if not self.game_over():
+            # Computer makes a move on a worker thread. The buttons stay disabled until its move arrives.
+            self.set_thinking(True)
+            self.start_time = time.time()  # Start the timer
+            threading.Thread(target=self.think, args=(self.game.state(),), daemon=True).start()
+            self.master.after(POLL_INTERVAL, self.check_computer_move)
+
+    def think(self, state):
+        # runs on the worker thread. It only reads the GameState it was given, never the game itself.
+        # If the strategy fails, the error is put on the queue instead of a move, so the window doesn't wait forever.
+        try:
+            self.computer_moves.put(self.ai.choose_move(state))
+        except Exception as error:
+            self.computer_moves.put(error)
+
+    def check_computer_move(self):
+        try:
+            computer_move = self.computer_moves.get_nowait()
+        except queue.Empty:
+            self.master.after(POLL_INTERVAL, self.check_computer_move)
+            return
+        if isinstance(computer_move, Exception):
+            self.computer_failed(computer_move)
+            return
+        end_time = time.time()  # End the timer
+        print(f"The strategy function took {end_time - self.start_time} seconds to execute and the move was {computer_move}.")
+        #print(self.y.evaluate(self.game))
+        self.game.make_move(computer_move)
+        #print('player should be 1')
+        #print(self.game.current_player)
+        #print(self.game.board)
+        #print('------------------------------------------------------------------------------------------------------------------------------------------------')
+        
+        self.draw_move()
+        if not self.game_over():
+            self.set_thinking(False)
+            self.start_pondering()
+
+    def computer_failed(self, error):
+        # the computer couldn't move, so the user's last move is taken back and the user can play again
+        print(f"The strategy function failed: {error!r}")
+        self.game.unmake_move()
         self.draw_board()
+        self.set_thinking(False)
+        messagebox.showerror("Computer error", f"The computer couldn't choose a move:\n{error!r}\nYour last move was taken back.")
+        self.start_pondering()
+
+    def start_pondering(self):
+        # search the user's position on a worker thread while the user is thinking, if the computer can
+        if hasattr(self.ai, "ponder"):
+            self.ponder_stop = threading.Event()
+            self.ponder_thread = threading.Thread(target=self.ai.ponder, args=(self.game.state(), self.ponder_stop),
+                                                  daemon=True)
+            self.ponder_thread.start()
+
+    def stop_pondering(self):
+        # the search must be stopped before the game changes and the computer's own search starts
+        if self.ponder_thread is not None:
+            self.ponder_stop.set()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+            self.ponder_stop = None
+
+    def game_over(self):
         if self.game.winner is not None:
             winner_text = f"Player {self.game.winner} wins!"
-            messagebox.showinfo("Game Over", winner_text)
-            self.master.destroy()
+        elif self.game.ply == 42:
+            winner_text = "It's a tie!"
         else:
-            # Computer makes a move
-            start_time = time.time()  # Start the timer
-            game_safety_copy = copy.deepcopy(self.game)
-            computer_move = self.ai.strategy(game_safety_copy)
-            end_time = time.time()  # End the timer
-            print(f"The strategy function took {end_time - start_time} seconds to execute and the move was {computer_move}.")
-            #print(self.y.evaluate(self.game))
-            self.game.make_move(computer_move)
-            #print('player should be 1')
-            #print(self.game.current_player)
-            #print(self.game.board)
-            #print('------------------------------------------------------------------------------------------------------------------------------------------------')
-            
-            self.draw_board()
-            if self.game.winner is not None:
-                winner_text = f"Player {self.game.winner} wins!"
-                messagebox.showinfo("Game Over", winner_text)
-                self.master.destroy()
+            return False
+        messagebox.showinfo("Game Over", winner_text)
+        self.master.destroy()
+        return True
 
-    def draw_board(self):
-        self.canvas.delete("all")
+    def create_board(self):
+        # the boxes and discs are drawn once. After this only the colors of the discs change.
         for row in range(6):
+            row_discs = []
             for col in range(7):
                 x0, y0 = col * 60, row * 60
                 x1, y1 = x0 + 60, y0 + 60
                 self.canvas.create_rectangle(x0, y0, x1, y1, outline="black", fill="white")
+                row_discs.append(self.canvas.create_oval(x0 + 5, y0 + 5, x1 - 5, y1 - 5, fill="white", outline="white"))
+            self.discs.append(row_discs)
 
-                if self.game.board[row][col] == 1:
-                    self.canvas.create_oval(x0 + 5, y0 + 5, x1 - 5, y1 - 5, fill="red", outline="red")
-                elif self.game.board[row][col] == 2:
-                    self.canvas.create_oval(x0 + 5, y0 + 5, x1 - 5, y1 - 5, fill="yellow", outline="yellow")
+    def draw_board(self):
+        # recolor every disc and button, for when the whole board may have changed
+        board = self.game.board
+        for row in range(6):
+            for col in range(7):
+                color = COLORS[board[row][col]]
+                self.canvas.itemconfigure(self.discs[row][col], fill=color, outline=color)
+        for col in range(7):
+            self.update_button(col)
+
+    def draw_move(self):
+        # only the disc of the last move and the button of its column can have changed
+        col = self.game.moves[-1]
+        row = 6 - self.game.heights[col]
+        color = COLORS[1 if self.game.bitboards[0] & game.cell_bit(row, col) else 2]
+        self.canvas.itemconfigure(self.discs[row][col], fill=color, outline=color)
+        self.update_button(col)
 
+    def set_thinking(self, thinking):
+        # every button is disabled while the computer thinks, and enabled again (unless its column is full) after
+        self.thinking = thinking
         for col in range(7):
-            if self.game.board[0][col] == 0:
-                self.buttons[col]["state"] = tk.NORMAL
-            else:
-                self.buttons[col]["state"] = tk.DISABLED
+            self.update_button(col)
+
+    def update_button(self, col):
+        if self.game.heights[col] < 6 and not self.thinking:
+            self.buttons[col]["state"] = tk.NORMAL
+        else:
+            self.buttons[col]["state"] = tk.DISABLED
 
 
 if __name__ == "__main__":
@@ -0,0 +1,274 @@
+import math
+import random
+import time
+import Connect4Game as Game
+import Endgame_solver as Solver
+
+# weight of the exploration term of UCT. Higher values try less visited moves more often.
+EXPLORATION = 1.4
+
+
+class Node:
+    """
+    This class is one position of the search tree: the move that led to it, the results of the playouts that
+    went through it, and the positions after each of its moves that have been tried.
+
+    Instance Variables
+    ------------------
+    self.move: (int or None)
+                 The column played to reach this position, None for the root of a new tree
+    self.parent: (Node or None)
+                 The position before the move
+    self.player: (int)
+                 The player who made the move, whose wins are counted in self.wins
+    self.key: (int)
+                 Connect4Game.key of the position
+    self.children: (dict)
+                 The positions after each move tried so far, by column
+    self.untried: (list)
+                 The valid columns that have no child yet
+    self.winner: (int or None)
+                 The winner if the game is over in this position, 0 for a tie
+    self.visits, self.wins: (int, float)
+                 Number of playouts through this position and how many of them self.player won (ties count half)
+    """
+    __slots__ = ("move", "parent", "player", "key", "children", "untried", "winner", "visits", "wins")
+
+    def __init__(self, game, move=None, parent=None):
+        self.move = move
+        self.parent = parent
+        # after a winning move the player to move isn't switched, so the mover is found from the number of moves
+        self.player = 2 - game.ply % 2
+        self.key = game.key()
+        self.children = {}
+        if game.winner is not None:
+            self.winner = game.winner
+        elif game.ply == 42:
+            self.winner = 0
+        else:
+            self.winner = None
+        self.untried = [] if self.winner is not None else [col for col in range(7) if game.heights[col] < 6]
+        self.visits = 0
+        self.wins = 0.0
+
+
+class MCTSStrategy(Game.Connect4GameStrategy):
+    """
+    This class inherits from the abstract class Connect4GameStrategy and chooses a move with Monte Carlo Tree
+    Search. Each iteration walks down the tree of moves tried so far, picking moves with UCT (good results plus
+    a bonus for moves tried less often), adds one new position to the tree, and plays the game out to the end
+    from there with random moves (a playout). The result is counted in every position on the way. The move
+    tried most often at the root is played.
+
+    The tree is kept between moves of the same game, so the playouts already done below the new position are
+    not lost. The more time it is given the more playouts it runs and the stronger it plays.
+
+    Instance Variables
+    ------------------
+    self.name: (str)
+              Optional parameter with default value
+    self.time_limit: (float or None)
+              Seconds to search each move for, or None to run exactly iterations iterations
+    self.iterations: (int or None)
+              Optional limit on the number of iterations per move. Without a time limit the search is
+              reproducible under a seed
+    self.biased: (bool)
+              If True, playouts take a winning move or block the opponent's win when there is one, the first things
+              AI_strategy looks for, and only play randomly otherwise
+    self.endgame: (EndgameSolver or None)
+              Solver that plays the last moves perfectly, used once endgame_threshold cells or fewer are empty
+    self.root: (Node or None)
+              Root of the tree of the last move
+    self.playouts: (int)
+              Number of playouts run for the last move
+    self.playouts_per_second: (float)
+              Playout rate of the last move
+
+    Methods
+    -------
+
+    strategy: This method recieves a Connect4Game and returns the move tried most often by the search.
+
+    playout: Plays a game out to the end and returns the winner.
+
+    search_metrics: Reports the playouts run for the last move.
+
+    """
+    def __init__(self, name="MCTS", time_limit=0.8, iterations=None, biased=False, seed=None, endgame_threshold=18):
+        if time_limit is None and iterations is None:
+            raise ValueError("MCTSStrategy needs a time_limit, iterations or both")
+        self.name = name
+        self.time_limit = time_limit
+        self.iterations = iterations
+        self.biased = biased
+        self.random = random.Random(seed)
+        self.endgame = Solver.EndgameSolver(endgame_threshold) if endgame_threshold else None
+        self.root = None
+        self.playouts = 0
+        self.playouts_per_second = 0.0
+
+    def strategy(self, game_safety_copy):
+        """
+        This method recieves a Connect4Game and returns the move tried most often by the search.
+
+        Parameters
+        ----------
+        game_safety_copy (object):
+                An instance of the Connect4Game class.
+
+        Returns
+        -------
+        int: a number representing the column of the move to make
+        """
+        start = time.perf_counter()
+        # without a time limit only the number of iterations stops the search
+        deadline = math.inf if self.time_limit is None else self.search_deadline()
+        game = game_safety_copy
+        root = self.find_root(game)
+        # moves that hand the opponent a win on top of them are never tried from the root
+        candidates = self.candidate_moves(game)
+        root.untried = [col for col in root.untried if col in candidates]
+        root_ply = game.ply
+        self.playouts = 0
+        while self.iterations is None or self.playouts < self.iterations:
+            # the clock is checked every few iterations, always after at least one
+            if self.playouts & 15 == 0 and self.playouts and time.perf_counter() > deadline:
+                break
+            node = root
+            # selection: go down the tree while every move of the position has been tried
+            while not node.untried and node.children:
+                node = self.select(node)
+                game.make_move(node.move)
+            # expansion: add one untried move to the tree
+            if node.untried:
+                move = node.untried.pop(self.random.randrange(len(node.untried)))
+                game.make_move(move)
+                child = Node(game, move, node)
+                node.children[move] = child
+                node = child
+            # simulation
+            winner = node.winner if node.winner is not None else self.playout(game)
+            self.playouts += 1
+            # backpropagation: count the result for the player who moved into each position on the way up
+            while node is not None:
+                node.visits += 1
+                if winner == node.player:
+                    node.wins += 1
+                elif winner == 0:
+                    node.wins += 0.5
+                node = node.parent
+            while game.ply > root_ply:
+                game.unmake_move()
+        elapsed = time.perf_counter() - start
+        self.playouts_per_second = self.playouts / elapsed if elapsed > 0 else 0.0
+        self.root = root
+        children = [child for child in root.children.values() if child.move in candidates] or root.children.values()
+        return max(children, key=lambda child: child.visits).move
+
+    def search_metrics(self):
+        """
+        This method reports the playouts run for the last move, for metrics, as its nodes. Each playout adds at most one
+        position to the tree.
+
+        Returns
+        -------
+        dict: nodes
+        """
+        return {"nodes": self.playouts}
+
+    def find_root(self, game):
+        """
+        This method finds the position of the game in the tree of the last move, which is usually two moves (ours
+        and the opponent's) below the last root. A new tree is started if it isn't there, e.g. in a new game.
+
+        Parameters
+        ----------
+        game (object):
+                An instance of the Connect4Game class.
+
+        Returns
+        -------
+        Node: the root for this move, without a parent so the rest of the old tree can be freed
+        """
+        key = game.key()
+        if self.root is not None:
+            for child in self.root.children.values():
+                for node in [child] + list(child.children.values()):
+                    if node.key == key and node.winner is None:
+                        node.parent = None
+                        node.move = None
+                        return node
+        return Node(game)
+
+    def select(self, node):
+        """
+        This method picks the child with the highest UCT value: its win rate plus a bonus that grows for
+        children visited less often than their siblings.
+
+        Parameters
+        ----------
+        node (Node)
+                A position whose moves have all been tried.
+
+        Returns
+        -------
+        Node: the child to go down to
+        """
+        log_visits = math.log(node.visits)
+        return max(node.children.values(),
+                   key=lambda child: child.wins / child.visits + EXPLORATION * math.sqrt(log_visits / child.visits))
+
+    def playout(self, game):
+        """
+        This method plays the game out to the end on copies of the bitboards, so the game itself isn't changed.
+
+        Parameters
+        ----------
+        game (object):
+                An instance of the Connect4Game class with no winner yet.
+
+        Returns
+        -------
+        int: the winning player, or 0 for a tie
+        """
+        bitboards = game.bitboards[:]
+        heights = game.heights[:]
+        player = game.current_player
+        moves = [col for col in range(7) if heights[col] < 6]
+        choice = self.random.choice
+        while moves:
+            if self.biased:
+                col = self.forced_move(bitboards, heights, player)
+                if col is None:
+                    col = choice(moves)
+            else:
+                col = choice(moves)
+            pieces = bitboards[player - 1] | (1 << (col * Game.COLUMN_BITS + heights[col]))
+            bitboards[player - 1] = pieces
+            heights[col] += 1
+            if heights[col] == 6:
+                moves.remove(col)
+            if Game.has_four(pieces):
+                return player
+            player = 3 - player
+        return 0
+
+    @staticmethod
+    def forced_move(bitboards, heights, player):
+        """
+        This method finds a column that wins for the player, or else one that blocks a win of the opponent.
+
+        Returns
+        -------
+        int or None: the column, or None if there is no such move
+        """
+        blocking = None
+        for col in range(7):
+            if heights[col] == 6:
+                continue
+            bit = 1 << (col * Game.COLUMN_BITS + heights[col])
+            if Game.has_four(bitboards[player - 1] | bit):
+                return col
+            if blocking is None and Game.has_four(bitboards[2 - player] | bit):
+                blocking = col
+        return blocking
@@ -0,0 +1,148 @@
+import Connect4Game as Game
+
+# columns from the middle outwards, the order of moves that nothing else tells apart
+CENTER_ORDER = [3, 2, 4, 1, 5, 0, 6]
+# position of each column in CENTER_ORDER
+CENTER_RANK = [CENTER_ORDER.index(col) for col in range(7)]
+
+# the groups moves are ordered in, best first
+HASH_MOVE = 0
+WIN = 1
+BLOCK = 2
+KILLER = 3
+QUIET = 5
+
+
+class MoveOrdering:
+    """
+    This class puts the moves of a position in the order a search should try them. Alpha-beta only cuts off
+    the rest of the moves once it has tried a good one, so the sooner the best move is tried the fewer positions
+    are searched. The order is:
+
+    1. the hash move, the best move stored in the transposition table by an earlier search of the position
+    2. moves that win straight away
+    3. moves that block a win of the opponent
+    4. the killer moves of the ply: the last two moves that caused a cut-off in another position with the same
+       number of pieces, which are often good in this one too
+    5. the rest, by their history score (how much searching they have saved by causing cut-offs anywhere in the
+       search so far), and from the middle column outwards when the scores are equal
+
+    The search tells the class about every cut-off with cutoff, which is how the killers and history are learned.
+
+    Instance Variables
+    ------------------
+    self.killers: (list)
+                 Two killer moves for each number of pieces on the board, newest first
+    self.history: (list)
+                 For each player, the history score of each column
+    self.cutoffs: (int)
+                 Number of cut-offs reported
+    self.first_move_cutoffs: (int)
+                 Number of those cut-offs made by the first move tried, a measure of how good the ordering is
+
+    Methods
+    -------
+    order: Lists the valid moves of a position in the order to search them.
+
+    cutoff: Records a move that caused a cut-off.
+
+    age: Scales the history scores down before a new search.
+
+    clear: Forgets the killers and history and resets the counters.
+
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """
+        This method forgets the killers and history and resets the counters.
+        """
+        self.killers = [[None, None] for _ in range(43)]
+        self.history = [[0] * 7, [0] * 7]
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def age(self):
+        """
+        This method halves the history scores, so what was learned in the searches of earlier moves counts for
+        less than what the next search learns.
+        """
+        for scores in self.history:
+            for col in range(7):
+                scores[col] >>= 1
+
+    def order(self, game, hash_move=None, wins=None, blocks=None):
+        """
+        This method lists the valid moves of a position in the order to search them.
+
+        Parameters
+        ----------
+        game (object):
+                An instance of the Connect4Game class.
+        hash_move (int or None):
+                The best move of an earlier search of the position, if there is one.
+        wins, blocks (int or None):
+                Bitboards of the cells the player to move and the opponent can win on with their next move, if
+                the search already knows them (like IncrementalEvaluation.winning_moves). They are worked out
+                from the board if not.
+
+        Returns
+        -------
+        list: the valid columns in search order
+        """
+        heights = game.heights
+        if wins is None or blocks is None:
+            bitboards = game.bitboards
+            occupied = bitboards[0] | bitboards[1]
+            playable = (occupied + Game.BOTTOM_MASK) & Game.BOARD_MASK
+            wins = Game.winning_cells(bitboards[game.current_player - 1], occupied) & playable
+            blocks = Game.winning_cells(bitboards[2 - game.current_player], occupied) & playable
+        killers = self.killers[game.ply]
+        history = self.history[game.current_player - 1]
+        ranked = []
+        for col in CENTER_ORDER:
+            height = heights[col]
+            if height == 6:
+                continue
+            bit = 1 << (col * Game.COLUMN_BITS + height)
+            if col == hash_move:
+                group = HASH_MOVE
+            elif wins & bit:
+                group = WIN
+            elif blocks & bit:
+                group = BLOCK
+            elif col == killers[0]:
+                group = KILLER
+            elif col == killers[1]:
+                group = KILLER + 1
+            else:
+                group = QUIET
+            ranked.append((group, -history[col], CENTER_RANK[col], col))
+        ranked.sort()
+        return [entry[3] for entry in ranked]
+
+    def cutoff(self, game, move, depth, first=False):
+        """
+        This method records a move that caused a cut-off, as a killer of the ply and in the history of the
+        player to move. Moves found deeper in the search count for more, since they saved more work.
+
+        Parameters
+        ----------
+        game (object):
+                The Connect4Game in the position where the cut-off happened.
+        move (int):
+                The column that caused it.
+        depth (int):
+                Number of moves that were left to search in the position.
+        first (bool):
+                True if the move was the first one tried.
+        """
+        self.cutoffs += 1
+        if first:
+            self.first_move_cutoffs += 1
+        killers = self.killers[game.ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[game.current_player - 1][move] += depth * depth
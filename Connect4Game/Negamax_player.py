@@ -0,0 +1,434 @@
+import math
+import threading
+import time
+import Connect4Game as Game
+import Transposition_table as TT
+import Evaluation as Eval
+import Endgame_solver as Solver
+import Move_ordering as Ordering
+
+# score of a win for the player who makes it. The number of moves played is subtracted from it so that a quicker
+# win scores higher than a slower one, and a slower loss higher than a quicker one.
+WIN_SCORE = 1000000
+
+# columns from the middle outwards. Middle moves are usually better, and trying good moves first lets
+# alpha-beta cut off more of the search.
+MOVE_ORDER = [3, 2, 4, 1, 5, 0, 6]
+
+# the clock is looked at once every this many positions (a power of two less one, to test with &), which is
+# often enough to stop within a few milliseconds of the deadline
+CLOCK_CHECK_MASK = 1023
+
+
+class NegamaxStrategy(Game.Connect4GameStrategy):
+    """
+    This class inherits from the abstract class Connect4GameStrategy and chooses a move by searching the game
+    a fixed number of moves ahead with negamax and alpha-beta pruning. Negamax scores every position for the
+    player to move, so the score of a move is minus the score of the position it leaves for the opponent.
+    Positions at the end of the search are scored with the lines of two and three that AI_strategy looks for.
+    Search results are kept in a transposition table, so a position reached again through another order of
+    moves is not searched again. The table is kept from one move to the next, and can be shared between
+    strategies by passing the same table to each of them.
+    
+    With a time limit, the search is run again one move deeper each time (iterative deepening) until the time 
+    is up, and the move of the last search that finished is played. The clock is checked during the search so
+    the move is always ready before the limit, instead of the whole move being lost to a timeout.
+
+    Instance Variables
+    ------------------
+    self.name: (str)
+              Optional parameter with default value
+    self.depth: (int)
+              Number of moves to search ahead, or the deepest search to try when there is a time limit
+    self.time_limit: (float or None)
+              Seconds to search each move for, or None to always search to self.depth
+    self.nodes: (int)
+              Number of positions searched for the last move
+    self.depth_reached: (int)
+              Depth of the last finished search for the last move
+    self.depth_results: (list)
+              The best move and score of each finished search of the last move with a time limit, shallowest first
+    self.timed_out: (bool)
+              True if the time limit cut the last search of the last move short
+    self.table: (TranspositionTable)
+              The search results kept between moves
+    self.ordering: (MoveOrdering or None)
+              The killer moves and history used to order moves, or None to only order by the hash move and from
+              the middle outwards
+    self.book: (OpeningBook or None)
+              Optional opening book whose moves are played instead of searching
+    self.endgame: (EndgameSolver or None)
+              Solver that plays the last moves perfectly, used once endgame_threshold cells or fewer are empty
+
+    Methods
+    -------
+
+    strategy: This method recieves a Connect4Game and returns the move with the best search score.
+
+    iterative_deepening: Searches deeper and deeper until a deadline and returns the last finished result.
+
+    search_root: Searches every move of the position to a given depth.
+
+    negamax: Scores a position by searching it to a given depth.
+
+    ordered_moves: Lists the moves of a position in the order to search them.
+
+    ponder: Searches while the opponent is thinking, to fill the transposition table.
+
+    search_metrics: Reports the positions searched and depth reached for the last move.
+
+    search_counters: Returns the running totals of transposition table probes.
+
+    evaluate: Scores a position at the end of the search without searching any further.
+
+    """
+    def __init__(self, name="Negamax", depth=6, table=None, time_limit=None, book=None, endgame_threshold=18,
+                 ordering=True):
+        self.name = name
+        self.depth = depth
+        self.time_limit = time_limit
+        self.nodes = 0
+        self.depth_reached = 0
+        self.depth_results = []
+        self.timed_out = False
+        self.deadline = None
+        # the threading.Event of the running ponder, which stops it once set. It is None while not pondering,
+        # so a strategy can still be pickled to run in another process.
+        self.stop_requested = None
+        self.evaluation = None
+        self.table = TT.TranspositionTable() if table is None else table
+        self.book = book
+        self.ordering = Ordering.MoveOrdering() if ordering else None
+        self.endgame = Solver.EndgameSolver(endgame_threshold) if endgame_threshold else None
+
+    def strategy(self, game_safety_copy):
+        """
+        This method recieves a Connect4Game and returns the move with the best search score.
+        Moves are made and taken back on the game itself, so it must be a copy of the real game.
+
+        Parameters
+        ----------
+        game_safety_copy (object):
+                An instance of the Connect4Game class.
+
+        Returns
+        -------
+        int: a number representing the column of the move to make
+        """
+        if self.ordering is not None:
+            self.ordering.age()
+        if self.time_limit is None:
+            self.nodes = 0
+            self.depth_reached = self.depth
+            self.timed_out = False
+            move, _ = self.search_root(game_safety_copy, self.depth)
+            return move
+        return self.iterative_deepening(game_safety_copy, self.search_deadline())
+
+    def ponder(self, state, stop=None):
+        """
+        This method searches a position where the opponent is to move, for as long as the opponent thinks, so
+        the transposition table already holds deep results for the positions after each of the opponent's
+        moves when it is our turn. It is meant to run on a thread of its own until stop is set (or
+        stop_pondering is called), and must not run while the strategy is choosing a move.
+
+        Parameters
+        ----------
+        state (GameState):
+                The position the opponent is to move in.
+        stop (threading.Event or None):
+                Event that stops this ponder once set, or None for a new one. Each ponder has its own, so a
+                request to stop one can never stop the next. The caller should pass one if it may ask to stop
+                before the thread has started.
+        """
+        self.stop_requested = threading.Event() if stop is None else stop
+        try:
+            game = state.to_game()
+            if game.winner is None and game.ply < 42:
+                self.iterative_deepening(game, math.inf)
+        finally:
+            self.stop_requested = None
+
+    def stop_pondering(self):
+        """
+        This method asks the running ponder to stop, by setting its stop event. The search stops at its next
+        look at the clock, within a few milliseconds, and what it found stays in the table. It does nothing
+        if no ponder is running.
+        """
+        stop = self.stop_requested
+        if stop is not None:
+            stop.set()
+
+    def search_metrics(self):
+        """
+        This method reports the positions searched and depth reached for the last move, for metrics.
+
+        Returns
+        -------
+        dict: nodes, depth and timeouts (1 if the time limit cut the last search short)
+        """
+        return {"nodes": self.nodes, "depth": self.depth_reached, "timeouts": int(self.timed_out)}
+
+    def search_counters(self):
+        """
+        This method returns the running totals of probes of the transposition table and the endgame solver's.
+
+        Returns
+        -------
+        dict: cache_hits and cache_misses so far
+        """
+        counters = super().search_counters()
+        counters["cache_hits"] += self.table.hits
+        counters["cache_misses"] += self.table.misses
+        return counters
+
+    def iterative_deepening(self, game, deadline, root_moves=None):
+        """
+        This method searches the position one move deeper at a time until the deadline passes, the deepest
+        search (self.depth) is done, or the result of the game is known. A search the deadline cuts short is
+        thrown away. Each search is quick to redo the moves of the one before, because the transposition 
+        table already holds them and the best moves found are tried first.
+
+        Parameters
+        ----------
+        game (object):
+                An instance of the Connect4Game class.
+        deadline (float):
+                The time.perf_counter() value by which the move must be chosen.
+        root_moves (list or None):
+                The moves to search at the root, or None for all the candidate moves.
+
+        Returns
+        -------
+        int: the column of the best move of the last finished search
+        """
+        self.nodes = 0
+        self.depth_reached = 0
+        self.depth_results = []
+        self.timed_out = False
+        root_ply = game.ply
+        best_move = None
+        # there is nothing left to search past the end of the board
+        for depth in range(1, min(self.depth, 42 - root_ply) + 1):
+            # the first search is short and always finished, so there is always a move to play
+            self.deadline = deadline if depth > 1 else None
+            try:
+                best_move, score = self.search_root(game, depth, root_moves)
+            except Game.SearchTimeout:
+                # take back the moves the search had made when it was stopped
+                while game.ply > root_ply:
+                    self.evaluation.unmake_move()
+                self.timed_out = True
+                break
+            self.depth_reached = depth
+            self.depth_results.append((best_move, score))
+            # once a win or loss is certain, searching deeper doesn't change the move
+            if abs(score) > WIN_SCORE - 42:
+                break
+        self.deadline = None
+        return best_move
+
+    def search_root(self, game, depth, root_moves=None):
+        """
+        This method searches every move of the position to the given depth.
+
+        Parameters
+        ----------
+        game (object):
+                An instance of the Connect4Game class.
+        depth (int):
+                Number of moves to search ahead.
+        root_moves (list or None):
+                The moves to search, or None for all the candidate moves.
+
+        Returns
+        -------
+        tuple: the best column and its score
+        """
+        # moves are made through an IncrementalEvaluation of the game, so the score of the positions at the end of
+        # the search is always ready
+        self.evaluation = evaluation = Eval.IncrementalEvaluation(game)
+        alpha = -WIN_SCORE - 1
+        best_move = None
+        # the table is keyed by the canonical key, so a position and its mirror image share an entry
+        key, mirrored = game.canonical_key()
+        # moves that hand the opponent a win on top of them are left out
+        candidates = self.candidate_moves(game) if root_moves is None else root_moves
+        # the best move of a shallower search of this position is searched first
+        for col in self.ordered_moves(game, self.table.probe(key), mirrored):
+            if col not in candidates:
+                continue
+            evaluation.make_move(col)
+            if game.winner is not None:
+                score = WIN_SCORE - game.ply
+            else:
+                score = -self.negamax(game, depth - 1, -WIN_SCORE - 1, -alpha)
+            evaluation.unmake_move()
+            # keep the first of equal moves, which is the one nearest the middle
+            if best_move is None or score > alpha:
+                alpha = score
+                best_move = col
+        # the best of only some of the moves (like a ParallelNegamaxStrategy helper's share) is only a lower bound
+        # of the score of the position, since one of the other moves may be better
+        flag = TT.EXACT if root_moves is None else TT.LOWER_BOUND
+        self.table.store(key, depth, flag, alpha, Game.mirror_move(best_move, mirrored))
+        return best_move, alpha
+
+    def negamax(self, game, depth, alpha, beta):
+        """
+        This method scores a position for the player to move by searching it to a given depth. Once a move is
+        found that scores at least beta the opponent would never allow the position, so the rest of the moves
+        are not searched.
+
+        Parameters
+        ----------
+        game (object):
+                An instance of the Connect4Game class, with no winner yet.
+        depth (int):
+                Number of moves left to search.
+        alpha (int):
+                Score the player to move is already sure of from an earlier move.
+        beta (int):
+                Score the opponent is already sure of, as the highest score that still matters.
+
+        Returns
+        -------
+        int: the score of the position for the player to move
+        """
+        self.nodes += 1
+        if (self.deadline is not None and not self.nodes & CLOCK_CHECK_MASK
+                and ((self.stop_requested is not None and self.stop_requested.is_set())
+                     or time.perf_counter() > self.deadline)):
+            raise Game.SearchTimeout
+        # a full board without a winner is a tie
+        if game.ply == 42:
+            return 0
+        if depth == 0:
+            return self.evaluation.score()
+        bitboards = game.bitboards
+        key, mirrored = Game.canonical_key(bitboards[0] + (bitboards[0] | bitboards[1]))
+        entry = self.table.probe(key)
+        if entry is not None and entry[1] >= depth:
+            # a search at least as deep has been done before. Its score can be used as is if it is exact, or
+            # if the bound it gives is already outside the alpha-beta window.
+            flag, score = entry[2], entry[3]
+            if (flag == TT.EXACT or (flag == TT.LOWER_BOUND and score >= beta)
+                    or (flag == TT.UPPER_BOUND and score <= alpha)):
+                return score
+        evaluation = self.evaluation
+        original_alpha = alpha
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        for index, col in enumerate(self.ordered_moves(game, entry, mirrored)):
+            evaluation.make_move(col)
+            if game.winner is not None:
+                score = WIN_SCORE - game.ply
+            else:
+                score = -self.negamax(game, depth - 1, -beta, -alpha)
+            evaluation.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = col
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if self.ordering is not None:
+                            self.ordering.cutoff(game, col, depth, index == 0)
+                        break
+        # the score is only exact if it fell inside the window the search was given
+        if best_score <= original_alpha:
+            flag = TT.UPPER_BOUND
+        elif best_score >= beta:
+            flag = TT.LOWER_BOUND
+        else:
+            flag = TT.EXACT
+        self.table.store(key, depth, flag, best_score, Game.mirror_move(best_move, mirrored))
+        return best_score
+
+    def ordered_moves(self, game, entry, mirrored):
+        """
+        This method lists the valid moves of a position in the order to search them, with self.ordering if there
+        is one and with move_order if not.
+
+        Parameters
+        ----------
+        game (object):
+                An instance of the Connect4Game class.
+        entry (tuple or None):
+                The transposition table entry of the position, if there is one.
+        mirrored (bool):
+                True if the entry was stored for the mirror image of the position.
+
+        Returns
+        -------
+        list: the valid columns in search order
+        """
+        if self.ordering is None:
+            return self.move_order(game, entry, mirrored)
+        hash_move = Game.mirror_move(entry[4], mirrored) if entry is not None else None
+        player = game.current_player
+        return self.ordering.order(game, hash_move, self.evaluation.winning_moves(player),
+                                   self.evaluation.winning_moves(3 - player))
+
+    @staticmethod
+    def move_order(game, entry=None, mirrored=False):
+        """
+        This method lists the valid moves of a position in the order to search them: the best move found by an
+        earlier search of the position first, then from the middle column outwards.
+
+        Parameters
+        ----------
+        game (object):
+                An instance of the Connect4Game class.
+        entry (tuple or None):
+                The transposition table entry of the position, if there is one.
+        mirrored (bool):
+                True if the entry was stored for the mirror image of the position.
+
+        Returns
+        -------
+        list: the valid columns in search order
+        """
+        heights = game.heights
+        moves = [col for col in MOVE_ORDER if heights[col] < 6]
+        if entry is not None:
+            hash_move = Game.mirror_move(entry[4], mirrored)
+            if hash_move in moves:
+                moves.remove(hash_move)
+                moves.insert(0, hash_move)
+        return moves
+
+    @staticmethod
+    def evaluate(game):
+        """
+        This method scores a position for the player to move without searching any further. Every window of four
+        cells with pieces of only one player counts for that player, and so do pieces in the middle column.
+        The search itself gets the same score from IncrementalEvaluation.score, which keeps the window counts up
+        to date as moves are made instead of counting them again for every position.
+
+        Parameters
+        ----------
+        game (object):
+                An instance of the Connect4Game class.
+
+        Returns
+        -------
+        int: the score of the position for the player to move
+        """
+        own = game.bitboards[game.current_player - 1]
+        other = game.bitboards[2 - game.current_player]
+        score = Eval.CENTER_SCORE * (Game.count_bits(own & Eval.CENTER_MASK) - Game.count_bits(other & Eval.CENTER_MASK))
+        for window in Game.WINDOW_MASKS:
+            if not other & window:
+                count = Game.count_bits(own & window)
+                if count == 3:
+                    score += Eval.THREE_SCORE
+                elif count == 2:
+                    score += Eval.TWO_SCORE
+            elif not own & window:
+                count = Game.count_bits(other & window)
+                if count == 3:
+                    score -= Eval.THREE_SCORE
+                elif count == 2:
+                    score -= Eval.TWO_SCORE
+        return score
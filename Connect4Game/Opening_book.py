@@ -0,0 +1,178 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+import Connect4Game as Game
+import Negamax_player as Negamax
+
+# the first bytes of a book file, to tell a book from any other file
+MAGIC = b"C4BOOK02"
+
+# one record of the book: canonical position key (8 bytes), best column (1 byte) and its score (4 bytes),
+# little-endian and without padding, so record i always starts at len(MAGIC) + i * RECORD.size
+RECORD = struct.Struct("<Qbi")
+
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+
+
+class OpeningBook:
+    """
+    This class looks up moves in an opening book file written by build_book. The file is a list of records sorted
+    by position key, and it is memory-mapped instead of read, so opening a book takes the same time whatever its
+    size and only the pages a lookup touches are read from disk. Worker processes that open the same file share
+    its pages in the operating system's cache. A lookup is a binary search over the records. A position and its
+    mirror image share one record under their canonical key.
+
+    The book can be handed to strategies running in other processes: it is pickled as its path and opened again
+    on the other side.
+
+    Instance Variables
+    ------------------
+    self.path: (str)
+                 The book file
+    self.size: (int)
+                 Number of positions in the book
+    self.hits, self.misses: (int)
+                 Number of lookups that found or didn't find their position
+
+    Methods
+    -------
+    lookup: Finds the best move and score of a position.
+
+    close: Unmaps the file.
+
+    """
+    def __init__(self, path=BOOK_FILE):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            self.data.close()
+            raise ValueError(f"{path} is not an opening book")
+        self.size = (len(self.data) - len(MAGIC)) // RECORD.size
+
+    def __len__(self):
+        return self.size
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def lookup(self, key):
+        """
+        This method finds the best move and score of a position.
+
+        Parameters
+        ----------
+        key (int)
+                The key of the position, from Connect4Game.key or GameState.key.
+
+        Returns
+        -------
+        tuple or None: the best column and its score for the player to move, or None if the position isn't in
+                       the book
+        """
+        key, mirrored = Game.canonical_key(key)
+        low, high = 0, self.size
+        data = self.data
+        while low < high:
+            middle = (low + high) // 2
+            record_key, move, score = RECORD.unpack_from(data, len(MAGIC) + middle * RECORD.size)
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                self.hits += 1
+                return Game.mirror_move(move, mirrored), score
+        self.misses += 1
+        return None
+
+    def close(self):
+        """
+        This method unmaps the file.
+        """
+        self.data.close()
+
+
+def book_positions(plies):
+    """
+    This function finds every position that can be reached in fewer than the given number of moves and isn't
+    over yet, each one once however many orders of moves lead to it, and only one of a position and its mirror
+    image.
+
+    Parameters
+    ----------
+    plies (int)
+            Number of moves from the start to stop at.
+
+    Returns
+    -------
+    list: the positions as Connect4Game instances
+    """
+    positions = {}
+    level = [Game.Connect4Game()]
+    for _ in range(plies):
+        next_level = {}
+        for game in level:
+            positions[game.canonical_key()[0]] = game
+            for col in range(7):
+                if game.is_valid_move(col):
+                    child = game.clone()
+                    child.make_move(col)
+                    if child.winner is None:
+                        next_level.setdefault(child.canonical_key()[0], child)
+        level = list(next_level.values())
+    return list(positions.values())
+
+
+def build_book(path=BOOK_FILE, plies=4, depth=8):
+    """
+    This function searches every position of the first moves with NegamaxStrategy and writes the best move of
+    each one to an opening book file, sorted by position key for OpeningBook to search.
+
+    Parameters
+    ----------
+    path (str)
+            The book file to write.
+    plies (int)
+            Positions with fewer moves than this are put in the book.
+    depth (int)
+            Number of moves each position is searched ahead.
+
+    Returns
+    -------
+    int: the number of positions written
+    """
+    searcher = Negamax.NegamaxStrategy(depth=depth)
+    records = []
+    for game in book_positions(plies):
+        move, score = searcher.search_root(game, depth)
+        key, mirrored = game.canonical_key()
+        records.append((key, Game.mirror_move(move, mirrored), score))
+    records.sort()
+    # write to a temporary file first, so a book that is open in other processes is never seen half written
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(MAGIC)
+        for record in records:
+            file.write(RECORD.pack(*record))
+    os.replace(temporary, path)
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build an opening book from NegamaxStrategy searches.")
+    parser.add_argument("--output", default=BOOK_FILE, help="book file to write")
+    parser.add_argument("--plies", type=int, default=4, help="put positions with fewer moves than this in the book")
+    parser.add_argument("--depth", type=int, default=8, help="number of moves to search each position ahead")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    count = build_book(args.output, args.plies, args.depth)
+    print(f"{count} positions written to {args.output} in {time.perf_counter() - start_time:.1f} seconds")
@@ -0,0 +1,259 @@
+import multiprocessing
+import multiprocessing.util
+import os
+import time
+import Connect4Game as Game
+import Negamax_player as Negamax
+import Transposition_table as TT
+import Shared_table
+import Endgame_solver as Solver
+
+# helpers are started with spawn rather than fork, so each one only holds its own end of its own pipe. If the
+# process that started them dies, the helpers see their pipe close and stop, instead of waiting forever.
+CONTEXT = multiprocessing.get_context("spawn")
+
+# columns from the middle outwards. The root moves are dealt out to the helpers in this order, so every helper
+# gets a share of the promising middle moves.
+CENTER_ORDER = [3, 2, 4, 1, 5, 0, 6]
+
+
+def serve(connection, depth, megabytes, table_name=None):
+    """
+    This function is the loop of a helper process. It keeps one NegamaxStrategy, with its transposition table,
+    for as long as it runs, and searches the root moves it is sent with iterative deepening until the time it is
+    given is up.
+
+    Messages received are ("search", bitboards, current_player, move_count, columns, seconds) or None to stop.
+    Messages sent are ("ready",) and, for each search, (depth_results, nodes) as found by
+    NegamaxStrategy.iterative_deepening.
+
+    Parameters
+    ----------
+    connection (Connection)
+            The helper's end of the pipe.
+    depth (int)
+            The deepest search to try.
+    megabytes (float)
+            Size of the helper's transposition table.
+    table_name (str or None)
+            Name of a SharedTranspositionTable to use instead of a table of its own.
+    """
+    if table_name is None:
+        table = TT.TranspositionTable(megabytes)
+    else:
+        table = Shared_table.SharedTranspositionTable.attach(table_name)
+    searcher = Negamax.NegamaxStrategy(depth=depth, table=table, endgame_threshold=0)
+    connection.send(("ready",))
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        _, bitboards, current_player, move_count, columns, seconds = message
+        deadline = time.perf_counter() + seconds
+        game = Game.GameState(bitboards, current_player, move_count).to_game()
+        if searcher.ordering is not None:
+            searcher.ordering.age()
+        searcher.iterative_deepening(game, deadline, columns)
+        connection.send((searcher.depth_results, searcher.nodes))
+    connection.close()
+
+
+def _stop_helpers(processes, connections, table=None):
+    # ask the helpers to stop, and kill any that don't
+    for connection in connections:
+        try:
+            connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+    for process in processes:
+        process.join(1)
+        if process.is_alive():
+            process.kill()
+            process.join()
+    for connection in connections:
+        connection.close()
+    if table is not None:
+        table.close()
+        table.unlink()
+
+
+class ParallelNegamaxStrategy(Game.Connect4GameStrategy):
+    """
+    This class inherits from the abstract class Connect4GameStrategy and runs the search of NegamaxStrategy on
+    several CPU cores at once. The moves of the position are dealt out to helper processes, one group of moves
+    per helper, and each helper searches its own moves deeper and deeper until the time limit (root splitting).
+    With fewer moves each, the helpers get deeper than one process searching every move in the same time.
+
+    A helper reports the best move and score of its moves for every depth it finished. Scores of the same depth
+    can be compared across helpers, so the move played is the best one of the deepest search that every helper
+    finished. Helpers that stopped early because their result was already certain count as finished at every
+    depth.
+
+    The helpers are started by prepare (which a StrategyHost worker calls before it reports it is ready), or
+    else the first time a move is chosen, and keep their transposition tables from one move to the next. The
+    strategy can be sent to another process (like a StrategyHost worker) before that, but not after.
+
+    Instance Variables
+    ------------------
+    self.name: (str)
+              Optional parameter with default value
+    self.workers: (int)
+              Number of helper processes
+    self.time_limit: (float)
+              Seconds to search each move for
+    self.depth: (int)
+              The deepest search to try
+    self.megabytes: (float)
+              Size of the transposition table of each helper, or of the table they share
+    self.shared: (bool)
+              If True, the helpers share one SharedTranspositionTable, so each one can use the results of the
+              others' searches
+    self.table: (SharedTranspositionTable or None)
+              The shared table, while the helpers are running
+    self.nodes: (int)
+              Number of positions searched by all the helpers for the last move
+    self.depth_reached: (int)
+              Depth of the search the last move was taken from
+
+    Methods
+    -------
+
+    strategy: This method recieves a Connect4Game and returns the best move of the helpers' searches.
+
+    start: Starts the helper processes.
+
+    prepare: Starts the helper processes if they aren't running yet.
+
+    close: Stops the helper processes.
+
+    search_metrics: Reports the positions searched and depth reached for the last move.
+
+    """
+    def __init__(self, name="Parallel Negamax", workers=None, time_limit=0.8, depth=42, megabytes=16, shared=False,
+                 book=None, endgame_threshold=18):
+        self.name = name
+        self.workers = workers or os.cpu_count() or 1
+        self.time_limit = time_limit
+        self.depth = depth
+        self.megabytes = megabytes
+        self.shared = shared
+        self.book = book
+        self.endgame = Solver.EndgameSolver(endgame_threshold) if endgame_threshold else None
+        self.nodes = 0
+        self.depth_reached = 0
+        self.processes = None
+        self.connections = None
+        self.table = None
+        self._finalizer = None
+
+    def __getstate__(self):
+        if self.processes is not None:
+            raise TypeError("a ParallelNegamaxStrategy can't be sent to another process once its helpers started")
+        return self.__dict__.copy()
+
+    def start(self):
+        """
+        This method starts the helper processes and waits until they are all ready.
+        """
+        self.processes = []
+        self.connections = []
+        if self.shared:
+            self.table = Shared_table.SharedTranspositionTable(self.megabytes)
+        table_name = None if self.table is None else self.table.name
+        for _ in range(self.workers):
+            connection, helper_end = CONTEXT.Pipe()
+            process = CONTEXT.Process(target=serve, args=(helper_end, self.depth, self.megabytes, table_name),
+                                      daemon=True)
+            process.start()
+            helper_end.close()
+            self.processes.append(process)
+            self.connections.append(connection)
+        for connection in self.connections:
+            connection.recv()
+        # stop the helpers when the process exits, even if close is never called
+        self._finalizer = multiprocessing.util.Finalize(
+            self, _stop_helpers, args=(self.processes, self.connections, self.table), exitpriority=10)
+
+    def prepare(self):
+        """
+        This method starts the helper processes if they aren't running yet, so starting them isn't taken from
+        the time of a move.
+        """
+        if self.processes is None:
+            self.start()
+
+    def close(self):
+        """
+        This method stops the helper processes.
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+        self.processes = None
+        self.connections = None
+        # the shared table was unlinked with the helpers, and a new one is made if they are started again
+        self.table = None
+        self._finalizer = None
+
+    def search_metrics(self):
+        """
+        This method reports the positions searched by all the helpers and the depth the move was taken from, for
+        metrics. The helpers' transposition tables are in their own processes, so their probes aren't counted.
+
+        Returns
+        -------
+        dict: nodes and depth
+        """
+        return {"nodes": self.nodes, "depth": self.depth_reached}
+
+    def strategy(self, game_safety_copy):
+        """
+        This method recieves a Connect4Game and returns the best move of the helpers' searches.
+
+        Parameters
+        ----------
+        game_safety_copy (object):
+                An instance of the Connect4Game class.
+
+        Returns
+        -------
+        int: a number representing the column of the move to make
+        """
+        game = game_safety_copy
+        # helpers that weren't started by prepare are started now, and the time that takes isn't counted as
+        # part of the move
+        start_time = time.perf_counter()
+        self.prepare()
+        deadline = self.search_deadline()
+        if self.move_deadline is not None:
+            deadline += time.perf_counter() - start_time
+        candidates = self.candidate_moves(game)
+        moves = [col for col in CENTER_ORDER if col in candidates]
+        groups = [moves[index::self.workers] for index in range(self.workers)]
+        busy = []
+        seconds = max(0.0, deadline - time.perf_counter())
+        for connection, group in zip(self.connections, groups):
+            if group:
+                connection.send(("search", tuple(game.bitboards), game.current_player, game.ply, group, seconds))
+                busy.append(connection)
+        results = []
+        self.nodes = 0
+        for connection in busy:
+            depth_results, nodes = connection.recv()
+            results.append(depth_results)
+            self.nodes += nodes
+        # a helper whose result was certain stopped early, and its result holds at any depth
+        deepest = max(len(depth_results) for depth_results in results)
+        for depth_results in results:
+            if abs(depth_results[-1][1]) > Negamax.WIN_SCORE - 42:
+                depth_results.extend([depth_results[-1]] * (deepest - len(depth_results)))
+        self.depth_reached = min(len(depth_results) for depth_results in results)
+        # keep the first of equal moves, which is the one nearest the middle
+        best_move, best_score = None, None
+        for move, score in sorted((depth_results[self.depth_reached - 1] for depth_results in results),
+                                  key=lambda result: CENTER_ORDER.index(result[0])):
+            if best_score is None or score > best_score:
+                best_move, best_score = move, score
+        return best_move
@@ -18,6 +18,11 @@ class RandomStrategy(Game.Connect4GameStrategy):
                valid move.
     
     """
+    # the strategy only reads the board, so it can be handed a GameState without copying the game
+    accepts_state = True
+    # the random player stays a plain baseline, without the wins and blocks choose_move would play for it
+    tactical = False
+
     def __init__(self, name="Daniel Batyrev"):
         self.name = name
     
@@ -0,0 +1,245 @@
+from multiprocessing import shared_memory
+
+# an entry is packed into one 64-bit integer, from the highest bits down:
+#   32 check bits of the hashed key | 21 bits of score | 6 bits of depth | 2 bits of flag | 3 bits of move
+# The flag is stored plus one, so a stored entry is never 0 and 0 marks an empty slot.
+CHECK_SHIFT = 32
+SCORE_SHIFT = 11
+DEPTH_SHIFT = 5
+FLAG_SHIFT = 3
+SCORE_OFFSET = 1 << 20
+MAX_DEPTH = 63
+# the move stored when there is none
+NO_MOVE = 7
+
+# slots at the start of the memory block before the entries, holding the number of buckets
+HEADER_SLOTS = 2
+
+MASK_64 = (1 << 64) - 1
+LOW_32 = (1 << 32) - 1
+
+
+def mix(key):
+    """
+    This function scrambles a position key into 64 bits where every bit depends on every bit of the key. The
+    high half picks the bucket and the low half is kept in the entry to check that it is the right position.
+
+    Parameters
+    ----------
+    key (int)
+            The key of the position.
+
+    Returns
+    -------
+    int: the scrambled key
+    """
+    key = ((key ^ (key >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    key = ((key ^ (key >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return key ^ (key >> 31)
+
+
+class SharedTranspositionTable:
+    """
+    This class is a transposition table kept in shared memory, so processes searching at the same time (like
+    the helpers of ParallelNegamaxStrategy or the workers of a tournament) can use each other's results. It can
+    be used wherever a TranspositionTable is, with the same probe and store methods.
+
+    Each entry is packed into a single 64-bit integer, which is written in one go, so no locks are needed: a
+    process reading a slot that another is writing sees either the old entry or the new one. Only 32 bits of
+    the scrambled key are kept to recognise the position, so two positions can, very rarely, be taken for each
+    other. A wrong move read from the table is harmless, since the search only uses it if it is a valid move.
+    Buckets have two slots like in TranspositionTable: one keeps the deepest search, the other the newest.
+
+    The table is made by one process and attached by name in the others. It is also sent to other processes as
+    its name, so a strategy holding one can be handed to a StrategyHost and the worker attaches to the same
+    memory. The process that made the table unlinks it when it is done.
+
+    Instance Variables
+    ------------------
+    self.name: (str)
+                 Name of the shared memory block, for attaching
+    self.buckets: (int)
+                 Number of buckets in the table
+    self.hits, self.misses: (int)
+                 Number of probes by this process that found or didn't find their position
+    self.overwrites: (int)
+                 Number of entries of other positions this process threw away to store a new one
+    self.collisions: (int)
+                 Number of stores by this process into a bucket whose deep slot held another position
+
+    Methods
+    -------
+    attach: Opens a table made by another process.
+
+    probe: Looks up the entry of a position.
+
+    store: Stores the result of searching a position.
+
+    clear: Empties the table and resets the counters of this process.
+
+    stats: Returns the counters and how full the table is.
+
+    close: Detaches this process from the table.
+
+    unlink: Frees the shared memory, after every process has closed it.
+
+    """
+    def __init__(self, megabytes=16, name=None, create=True):
+        if create:
+            buckets = max(1, int(megabytes * 2 ** 20) // 16)
+            self.memory = shared_memory.SharedMemory(name=name, create=True, size=(HEADER_SLOTS + 2 * buckets) * 8)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        self.slots = self.memory.buf.cast("Q")
+        # the number of buckets is kept in the memory itself, since the block can be rounded up to whole pages
+        # and every process must pick the same bucket for a key
+        if create:
+            self.slots[0] = buckets
+            self.clear()
+        self.buckets = self.slots[0]
+        self.hits = 0
+        self.misses = 0
+        self.overwrites = 0
+        self.collisions = 0
+
+    @classmethod
+    def attach(cls, name):
+        """
+        This method opens a table made by another process.
+
+        Parameters
+        ----------
+        name (str)
+                The name of the table, from its name variable.
+
+        Returns
+        -------
+        SharedTranspositionTable: the table
+        """
+        return cls(name=name, create=False)
+
+    def __getstate__(self):
+        return {"name": self.name}
+
+    def __setstate__(self, state):
+        self.__init__(name=state["name"], create=False)
+
+    def __del__(self):
+        # the view of the memory has to be let go of before the memory can be closed
+        if hasattr(self, "slots"):
+            self.close()
+
+    def __len__(self):
+        return sum(1 for slot in self.slots[HEADER_SLOTS:HEADER_SLOTS + 2 * self.buckets] if slot)
+
+    def clear(self):
+        """
+        This method empties the table, for every process using it, and resets the counters of this process.
+        """
+        start = HEADER_SLOTS * 8
+        self.memory.buf[start:start + 16 * self.slots[0]] = bytes(16 * self.slots[0])
+        self.hits = 0
+        self.misses = 0
+        self.overwrites = 0
+        self.collisions = 0
+
+    def probe(self, key):
+        """
+        This method looks up the entry of a position.
+
+        Parameters
+        ----------
+        key (int)
+                The key of the position, from Connect4Game.key.
+
+        Returns
+        -------
+        tuple or None: (key, depth, flag, score, move) of the position, or None if it isn't in the table
+        """
+        hashed = mix(key)
+        index = HEADER_SLOTS + 2 * ((hashed >> 32) % self.buckets)
+        check = hashed & LOW_32
+        slots = self.slots
+        for slot in (index, index + 1):
+            entry = slots[slot]
+            if entry and entry >> CHECK_SHIFT == check:
+                self.hits += 1
+                move = entry & NO_MOVE
+                return (key, (entry >> DEPTH_SHIFT) & MAX_DEPTH, ((entry >> FLAG_SHIFT) & 3) - 1,
+                        ((entry >> SCORE_SHIFT) & 0x1FFFFF) - SCORE_OFFSET, None if move == NO_MOVE else move)
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        """
+        This method stores the result of searching a position.
+
+        Parameters
+        ----------
+        key (int)
+                The key of the position, from Connect4Game.key.
+        depth (int)
+                The number of moves the position was searched ahead.
+        flag (int)
+                EXACT, LOWER_BOUND or UPPER_BOUND for the kind of score.
+        score (int)
+                The score found for the player to move.
+        move (int or None)
+                The best column found, or None if there was none.
+        """
+        hashed = mix(key)
+        index = HEADER_SLOTS + 2 * ((hashed >> 32) % self.buckets)
+        check = hashed & LOW_32
+        depth = min(depth, MAX_DEPTH)
+        entry = ((check << CHECK_SHIFT) | ((score + SCORE_OFFSET) << SCORE_SHIFT) | (depth << DEPTH_SHIFT)
+                 | ((flag + 1) << FLAG_SHIFT) | (NO_MOVE if move is None else move))
+        slots = self.slots
+        deep = slots[index]
+        if deep and deep >> CHECK_SHIFT != check:
+            self.collisions += 1
+        if not deep or deep >> CHECK_SHIFT == check or depth >= (deep >> DEPTH_SHIFT) & MAX_DEPTH:
+            slots[index] = entry
+            recent = slots[index + 1]
+            if recent and recent >> CHECK_SHIFT == check:
+                slots[index + 1] = 0
+            # a deep entry that is pushed out gets a second chance in the other slot of the bucket
+            if deep and deep >> CHECK_SHIFT != check:
+                self._store_recent(index + 1, deep)
+        else:
+            self._store_recent(index + 1, entry)
+
+    def _store_recent(self, slot, entry):
+        recent = self.slots[slot]
+        if recent and recent >> CHECK_SHIFT != entry >> CHECK_SHIFT:
+            self.overwrites += 1
+        self.slots[slot] = entry
+
+    def stats(self):
+        """
+        This method returns the counters of this process and how full the table is, for every process. Many
+        collisions and overwrites with a high occupancy mean the table is too small for the searches using it.
+
+        Returns
+        -------
+        dict: hits, misses, overwrites, collisions, entries stored, capacity in entries and occupancy
+              (entries / capacity)
+        """
+        entries = len(self)
+        return {"hits": self.hits, "misses": self.misses, "overwrites": self.overwrites,
+                "collisions": self.collisions, "entries": entries, "capacity": 2 * self.buckets,
+                "occupancy": entries / (2 * self.buckets)}
+
+    def close(self):
+        """
+        This method detaches this process from the table.
+        """
+        self.slots.release()
+        self.memory.close()
+
+    def unlink(self):
+        """
+        This method frees the shared memory. Only the process that made the table should call it, once every
+        process has closed the table.
+        """
+        self.memory.unlink()
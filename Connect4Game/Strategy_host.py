@@ -0,0 +1,208 @@
+import multiprocessing
+import multiprocessing.util
+import random
+import Connect4Game as Game
+
+
+def serve(competitor, connection):
+    """
+    This function is the loop of a worker process. It waits for positions on the pipe, has the competitor choose
+    a move for each one and sends the move back. The competitor stays alive between moves, so anything it keeps
+    (like a transposition table or a search tree) is still there for the next move.
+
+    Messages received are ("move", bitboards, current_player, move_count), ("seed", value) or None to stop.
+    Messages sent are ("ready",), ("move", column, metrics) or ("error", text), where metrics are the
+    measurements of the move from the competitor's metrics.
+
+    Parameters
+    ----------
+    competitor (object)
+            An instance of a Connect4GameStrategy subclass.
+    connection (Connection)
+            The worker's end of the pipe.
+    """
+    # anything slow the competitor sets up is done now, so it isn't taken from its first move
+    competitor.prepare()
+    connection.send(("ready",))
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        if message[0] == "seed":
+            random.seed(message[1])
+            continue
+        state = Game.GameState(*message[1:])
+        try:
+            move = competitor.choose_move(state)
+            connection.send(("move", move, competitor.metrics))
+        except Exception as error:
+            connection.send(("error", repr(error)))
+    connection.close()
+
+
+def _stop_worker(process, connection):
+    # ask the worker to stop, and kill it if it doesn't
+    try:
+        connection.send(None)
+    except (BrokenPipeError, OSError):
+        pass
+    process.join(1)
+    if process.is_alive():
+        process.kill()
+        process.join()
+    connection.close()
+
+
+class StrategyHost:
+    """
+    This class runs a competitor in its own long-lived worker process and asks it for moves over a pipe. The
+    deadline of a move is kept by the host: if no move arrives in time, the worker is killed and a new one is
+    started with a fresh copy of the competitor, so a slow strategy can always be stopped, unlike a thread that
+    can't interrupt Python code. Only the compact position (two integers, the player to move and the move count)
+    is sent for each move.
+
+    Instance Variables
+    ------------------
+    self.competitor: (object)
+                 The strategy, copied into each worker process that is started
+    self.name: (str)
+                 The competitor's name
+    self.time_limit: (float)
+                 Seconds the competitor has to answer each move
+    self.process, self.connection: (Process, Connection)
+                 The current worker and the host's end of its pipe
+    self.timeouts: (int)
+                 Number of moves that ran out of time, each of which restarted the worker
+    self.errors: (int)
+                 Number of moves that raised an error in the strategy or whose worker died, each of which
+                 restarted the worker if it died
+    self.failure: (str or None)
+                 Why the last move got no answer: "timeout" or "error", or None if it was answered
+    self.metrics: (dict or None)
+                 The measurements of the last move (see Connect4GameStrategy), or None if it ran out of time or
+                 raised an error
+    self.random_seed: (int or None)
+                 The last seed sent to the worker, sent again to every new worker, or None if it wasn't seeded
+
+    Methods
+    -------
+    start: Starts a worker process and waits until it is ready.
+
+    choose_move: Asks the worker for a move within the time limit.
+
+    seed: Seeds the random module of the worker.
+
+    close: Stops the worker.
+
+    """
+    def __init__(self, competitor, time_limit=1):
+        self.competitor = competitor
+        self.name = competitor.name
+        self.time_limit = time_limit
+        self.process = None
+        self.connection = None
+        self._finalizer = None
+        self.timeouts = 0
+        self.errors = 0
+        self.failure = None
+        self.metrics = None
+        self.random_seed = None
+
+    def start(self):
+        """
+        This method starts a worker process with the competitor and waits until it is ready (the competitor's
+        prepare has run), so the time it takes to start isn't taken from the first move. A worker started after
+        the host was seeded (like one that replaces a worker killed by restart) is seeded the same way.
+        """
+        self.connection, worker_end = multiprocessing.Pipe()
+        # the worker isn't a daemon process, so competitors can start processes of their own (daemons can't).
+        # The finalizer stops it when this process exits instead, even if close is never called.
+        self.process = multiprocessing.Process(target=serve, args=(self.competitor, worker_end))
+        self.process.start()
+        # only the worker uses its end of the pipe from now on
+        worker_end.close()
+        self._finalizer = multiprocessing.util.Finalize(self, _stop_worker, args=(self.process, self.connection),
+                                                        exitpriority=10)
+        self.connection.recv()
+        if self.random_seed is not None:
+            self.connection.send(("seed", self.random_seed))
+
+    def choose_move(self, state):
+        """
+        This method sends the position to the worker and waits for its move until the time limit.
+
+        Parameters
+        ----------
+        state (GameState):
+                The position to choose a move for.
+
+        Returns
+        -------
+        int or None: the column chosen, or None if the competitor ran out of time, raised an error or its worker
+                     died
+        """
+        if self.process is None:
+            self.start()
+        self.metrics = None
+        self.failure = None
+        try:
+            self.connection.send(("move", state.bitboards, state.current_player, state.move_count))
+            if not self.connection.poll(self.time_limit):
+                self.timeouts += 1
+                self.failure = "timeout"
+                self.restart()
+                return None
+            reply = self.connection.recv()
+        except (EOFError, OSError):
+            # the worker died (it exited, crashed or was killed) before or while choosing its move. poll
+            # returns at once when the pipe is closed, so this is found without waiting for the time limit.
+            self.errors += 1
+            self.failure = "error"
+            self.restart()
+            return None
+        if reply[0] == "error":
+            self.errors += 1
+            self.failure = "error"
+            return None
+        self.metrics = reply[2]
+        return reply[1]
+
+    def seed(self, value):
+        """
+        This method seeds the random module of the worker, so strategies that use it play the same every time.
+        The seed is kept, and any worker started later is seeded with it too.
+
+        Parameters
+        ----------
+        value (int)
+                The seed.
+        """
+        self.random_seed = value
+        if self.process is None:
+            # start seeds the new worker
+            self.start()
+        else:
+            self.connection.send(("seed", value))
+
+    def restart(self):
+        """
+        This method kills the worker, which may be in the middle of a move, and starts a new one.
+        """
+        self._finalizer.cancel()
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+        self.start()
+
+    def close(self):
+        """
+        This method asks the worker to stop and waits for it, killing it if it doesn't stop.
+        """
+        if self.process is None:
+            return
+        self._finalizer()
+        self.process = None
+        self.connection = None
@@ -0,0 +1,136 @@
+# the kind of score stored in an entry. A search cut off by alpha-beta only knows that the real score is at least
+# (LOWER_BOUND) or at most (UPPER_BOUND) the stored score, and only a complete search knows it exactly (EXACT).
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# odd 64-bit constant that position keys are multiplied by to spread them over the buckets. Keys of nearby positions
+# differ only in a few bits, and taking them modulo the number of buckets directly makes many of them collide.
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# rough size in bytes of one stored entry: the tuple, its integers and the list slot holding it
+ENTRY_BYTES = 150
+
+
+class TranspositionTable:
+    """
+    This class stores search results of positions so a position reached again through a different order of
+    moves doesn't have to be searched again. Entries are kept in buckets of two slots picked by the position
+    key. The first slot keeps the entry searched to the greatest depth, since it saved the most work, and the
+    second slot always takes the newest entry that doesn't go in the first one. The number of buckets is fixed
+    when the table is made, so the table never grows past its memory limit.
+
+    Instance Variables
+    ------------------
+    self.buckets: (int)
+                 Number of buckets in the table
+    self.deep: (list)
+                 The depth-preferred slot of each bucket
+    self.recent: (list)
+                 The always-replace slot of each bucket
+    self.hits, self.misses: (int)
+                 Number of probes that found or didn't find their position
+    self.overwrites: (int)
+                 Number of entries of other positions thrown away to store a new one
+
+    Methods
+    -------
+    probe: Looks up the entry of a position.
+
+    store: Stores the result of searching a position.
+
+    clear: Empties the table and resets its counters.
+
+    stats: Returns the counters and how full the table is.
+
+    """
+    def __init__(self, megabytes=16):
+        self.buckets = max(1, int(megabytes * 2 ** 20) // (2 * ENTRY_BYTES))
+        self.clear()
+
+    def __len__(self):
+        return sum(entry is not None for entry in self.deep) + sum(entry is not None for entry in self.recent)
+
+    def clear(self):
+        """
+        This method empties the table and resets its counters.
+        """
+        self.deep = [None] * self.buckets
+        self.recent = [None] * self.buckets
+        self.hits = 0
+        self.misses = 0
+        self.overwrites = 0
+
+    def probe(self, key):
+        """
+        This method looks up the entry of a position.
+
+        Parameters
+        ----------
+        key (int)
+                The key of the position, from Connect4Game.key.
+
+        Returns
+        -------
+        tuple or None: (key, depth, flag, score, move) of the position, or None if it isn't in the table
+        """
+        index = ((key * HASH_MULTIPLIER) >> 32) % self.buckets
+        entry = self.deep[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        entry = self.recent[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        """
+        This method stores the result of searching a position.
+
+        Parameters
+        ----------
+        key (int)
+                The key of the position, from Connect4Game.key.
+        depth (int)
+                The number of moves the position was searched ahead.
+        flag (int)
+                EXACT, LOWER_BOUND or UPPER_BOUND for the kind of score.
+        score (int)
+                The score found for the player to move.
+        move (int or None)
+                The best column found, or None if there was none.
+        """
+        index = ((key * HASH_MULTIPLIER) >> 32) % self.buckets
+        entry = (key, depth, flag, score, move)
+        deep = self.deep[index]
+        if deep is None or deep[0] == key or depth >= deep[1]:
+            self.deep[index] = entry
+            # don't keep an older result of the same position in the other slot
+            recent = self.recent[index]
+            if recent is not None and recent[0] == key:
+                self.recent[index] = None
+            # a deep entry that is pushed out gets a second chance in the other slot of the bucket
+            if deep is not None and deep[0] != key:
+                self._store_recent(index, deep)
+        else:
+            self._store_recent(index, entry)
+
+    def _store_recent(self, index, entry):
+        recent = self.recent[index]
+        if recent is not None and recent[0] != entry[0]:
+            self.overwrites += 1
+        self.recent[index] = entry
+
+    def stats(self):
+        """
+        This method returns the counters of the table and how full it is.
+
+        Returns
+        -------
+        dict: hits, misses, overwrites, entries stored and capacity in entries
+        """
+        return {"hits": self.hits, "misses": self.misses, "overwrites": self.overwrites,
+                "entries": len(self), "capacity": 2 * self.buckets}
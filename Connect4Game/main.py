@@ -2,30 +2,60 @@
 import Connect4Game
 # same for this file and its classes
 import Random_move as rand
-# import the copy module to use deepcopy to make a safe copy of the instance we are using
-import copy
-# import func_timeout module to set a time limit on each move
-import func_timeout
-
-# list of instances of the RandomStrategy class. One uses default name while the other is provided
-competitor_list = [rand.RandomStrategy(), rand.RandomStrategy("alter ego")]
+# runs each competitor in a worker process that can be stopped when a move takes too long
+import Strategy_host as host
+# modules to spread the games over several processes, to read settings from the command line and to seed the games
+import argparse
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
 
 # wait time of one second for a move using the strategy method further in the code.
 MAX_WAIT_TIME = 1
-# initialize a list to record number of wins per player and the number of ties
-winners = list()
 # instance of of the RandomStrategy class that has all the functionality of the Connect4Game class but with the addition
 # of the strategy method that can generate random valid moves
 random_choice = rand.RandomStrategy()
 
-# iterate through 1,000 games
-for game_nr in range(1000):
+# the hosts of the competitors of the games played by this process. Each worker process of the pool gets its own copy
+# of the competitors through init_worker, so the strategies are only sent to a worker once and not with every game.
+worker_hosts = None
+
+# the measurements of each move (see Connect4GameStrategy.metrics) that are added up for each competitor
+METRIC_TOTALS = ("wall_time", "cpu_time", "nodes", "depth", "cache_hits", "cache_misses", "timeouts")
+
+
+def play_game(competitor_list, game_nr, seed=None, metrics=None):
+    """
+    This function plays one game between two competitors and returns the result.
     
-# print the number of each game while computation is taking place so user wont't think program isn't working
-# during the 15 seconds or so that it takes the run the program
-    print(game_nr + 1)
+    Parameters
+    ----------
+    competitor_list (list)
+            The StrategyHosts of the two competitors. The first one plays first in even numbered games and second in odd numbered games,
+            the same alternation as reversing the list after every game.
+    game_nr (int)
+            The number of the game in the tournament.
+    seed (int or None)
+            If given, the random module is seeded with seed + game_nr before the game, and the competitors' random
+            modules from it as well, so every game plays the same no matter which process plays it or in what order.
+    metrics (dict or None)
+            If given, the measurements of every move are added to the totals of the competitor that made it, kept
+            in this dictionary by name (see add_metrics).
+            
+    Returns
+    -------
+    str: the name of the winner, or "tie"
+    """
+    if seed is not None:
+        random.seed(seed + game_nr)
+# the competitors play in their own processes, so their random modules are seeded there
+        for index, competitor in enumerate(competitor_list):
+            competitor.seed(2 * (seed + game_nr) + index)
+# the list is reversed for every other game thereby alternating the first turn of the game between players
+    if game_nr % 2:
+        competitor_list = competitor_list[::-1]
     
-# set tie to false since if there was a tie in the previous game, tie was set to true
+# set tie to false at the start of the game. It is set to true if the board fills up without a winner
     tie = False
 # create an instance of the Connect4Game class to have access the make move and is_valid_move functions
     game = Connect4Game.Connect4Game()
@@ -33,41 +63,34 @@ for game_nr in range(1000):
 # as long as there is no winner which is determined by the make_move function calling the check_winner and check_line fuctions.
 # this loop is for each of the 1,000 games and will break after all the moves have been made or if there is a winner
     while game.winner is None:
-        
-# make a safe copy of the game instance of the Connect4GAme class. This type of copy is completely separate from the original
-# game instance and changes made to one will not affect the other. I don't understand the need for a deepcopy in this scenario
-# since the strategy method isn't modifying the game state at all but is just generating a random valid move. I am assumin that 
-# this is just protocol for programming games
-        game_safety_copy = copy.deepcopy(game)
-        
-# the try and except clause implies that the code in the except clause will not produce the same potential
-# errors that the try code might. However, the code given to both are identical; they are both using the
-# strategy method which has the game_safety_copy passed to it. Perhaps the reason to use the try and except
-# is if the computation gets stuck we can sort of do a restart (I don't know if this understanding is correct
-# at all). I actually made a copy of this file and removed the func_timeout with the try and except and ran
-# the code and had the exact same performance as before. I realized afterwards that I didn't have to run the 
-# code without the func_timeout and try except to to see that there is no need for the try and except. 
-# The mere fact that the code ran 1,000 games in  about 13 seconds is proof that no timeout was ever being reached
-# since each complete game only took 13/1000 seconds! so each move was at most seven times less than that (since it
-# takes a minimum of seven moves to complete a game). And in reality a game played with random moves probably has
-# far more than seven moves in a game.
-        try:
-            
-# variable to be fed to the make_move function. It uses the func_timeout to set max time of one second to choose a 
-# move. The unusual syntax of brackets instead of parentheses (as it is in the except clause) is due to the specifics
-# of the func_timeout function.
+    
+# take a read-only snapshot of the game. A GameState can't be changed so a strategy can't tamper with the real game,
+# and nothing has to be copied to make it. Strategies that need a game to make moves on are given one rebuilt from the
+# state by choose_move.
+        game_state = game.state()
+    
+# ask the competitor for its move. Each competitor runs in its own worker process (see Strategy_host) which is sent the
+# position over a pipe and has MAX_WAIT_TIME seconds to answer. If it doesn't answer in time the worker is killed and 
+# restarted, which really stops it, unlike the thread func_timeout used to run each move in, which couldn't interrupt
+# a strategy that was busy computing. The host returns None for a move that ran out of time, raised an error or whose
+# worker died.
 # the competitor is referenced by using the values of the players identifying numbers which are 1 and 2. When subtracting
 # 1 from either of these numbers one gets either 0 or 1 which are the indexes of the values contained in the competitor
 # list. This allows alternating between turns of the competitors.
-            move = func_timeout.func_timeout(
-                MAX_WAIT_TIME, competitor_list[game.current_player - 1].strategy, [game_safety_copy])
-        except func_timeout.FunctionTimedOut:
-# print error message using f strings refferencing the current player's name indicating that a random move is being made
-            print(f'time out limit exceeded: {competitor_list[game.current_player - 1].name} performs random move')
-            
-# use the random_choice instance of the of RandomStrategy with the strategy method. See above that I don't really understand
-# the point of this
-            move = random_choice.strategy(game_safety_copy)
+        competitor = competitor_list[game.current_player - 1]
+        move = competitor.choose_move(game_state)
+        if metrics is not None:
+            add_metrics(metrics.setdefault(competitor.name, new_totals()), competitor.metrics)
+        if move is None:
+# print error message using f strings refferencing the current player's name indicating that a random move is being made,
+# and whether the competitor ran out of time or failed (raised an error or its worker died)
+            if competitor.failure == "timeout":
+                print(f'game {game_nr + 1}: time out limit exceeded: {competitor.name} performs random move')
+            else:
+                print(f'game {game_nr + 1}: strategy error: {competitor.name} performs random move')
+        
+# use the random_choice instance of the of RandomStrategy with the strategy method to make a move for the competitor
+            move = random_choice.strategy(game_state)
 # make the move produced by strategy. 
         game.make_move(move)
 # after each move, check if game is over by iterating over all columns from 0-6 and testing if any are valid moves.
@@ -77,32 +100,187 @@ for game_nr in range(1000):
 # of the mapped is_valid_move is zero meaning no moves are left or is there is a winner which would be determined by 
 # make_move function earlier. In addition, If the sum is zero that means that there must be a tie since no win has been detected
         if 0 == sum(map(game.is_valid_move, range(7))):
-            
+        
 # set tie to true to be used as a test to see if a tie should be added to the winners list
             tie = True
 # break out of while loop for this game
             break
     if tie:
-# add a tie to the winners list which holds the game results
-        winners.append("tie")
+# the result is the name of the winner or tie
+        return "tie"
+    return competitor_list[game.current_player - 1].name
+
+
+def init_worker(competitor_list):
+    # runs once in each worker process of the pool to start hosts for the competitors for all the games it plays. The 
+    # hosts' own worker processes are stopped together with the pool's worker when the pool shuts down.
+    global worker_hosts
+    worker_hosts = [host.StrategyHost(competitor, MAX_WAIT_TIME) for competitor in competitor_list]
+
+
+def play_worker_game(game_nr, seed):
+    # play one game in a worker process with the competitors given to init_worker, and send back the result with
+    # the measurements of the game's moves
+    metrics = {}
+    return play_game(worker_hosts, game_nr, seed, metrics), metrics
+
+
+def new_totals():
+    # the totals of a competitor before any move
+    totals = {name: 0 for name in METRIC_TOTALS}
+    totals.update({"moves": 0, "searches": 0, "lost_moves": 0, "max_wall_time": 0.0, "sources": {}})
+    return totals
+
+
+def add_metrics(totals, metrics):
+    """
+    This function adds the measurements of one move to the totals of the competitor that made it.
+    
+    Parameters
+    ----------
+    totals (dict)
+            The competitor's totals, from new_totals.
+    metrics (dict or None)
+            The measurements of the move from the competitor's host, or None for a move the host didn't get
+            (because of a timeout or an error), which is counted as lost.
+    """
+    if metrics is None:
+        totals["lost_moves"] += 1
+        return
+    totals["moves"] += 1
+    for name in METRIC_TOTALS:
+        totals[name] += metrics[name]
+    totals["max_wall_time"] = max(totals["max_wall_time"], metrics["wall_time"])
+    source = metrics["source"]
+    totals["sources"][source] = totals["sources"].get(source, 0) + 1
+# only the moves that were searched to some depth count towards the average depth
+    if metrics["depth"]:
+        totals["searches"] += 1
+
+
+def merge_metrics(metrics, other):
+    """
+    This function adds the totals of each competitor in one dictionary (from another process) to another one.
+    
+    Parameters
+    ----------
+    metrics (dict)
+            The totals to add to, by competitor name.
+    other (dict)
+            The totals to add, by competitor name.
+    """
+    for name, other_totals in other.items():
+        totals = metrics.setdefault(name, new_totals())
+        for key, value in other_totals.items():
+            if key == "max_wall_time":
+                totals[key] = max(totals[key], value)
+            elif key == "sources":
+                for source, count in value.items():
+                    totals[key][source] = totals[key].get(source, 0) + count
+            else:
+                totals[key] += value
+
+
+def metrics_table(metrics):
+    """
+    This function writes the totals of each competitor as a table, one row per competitor, with the averages
+    per move.
+    
+    Parameters
+    ----------
+    metrics (dict)
+            The totals by competitor name, from run_tournament.
+            
+    Returns
+    -------
+    str: the table
+    """
+    header = ("competitor", "moves", "lost", "mean ms", "max ms", "cpu ms", "nodes/move", "depth", "hit rate",
+              "timeouts", "sources")
+    rows = [header]
+    for name, totals in metrics.items():
+        moves = max(totals["moves"], 1)
+        probes = totals["cache_hits"] + totals["cache_misses"]
+        rows.append((name, str(totals["moves"]), str(totals["lost_moves"]),
+                     f"{1000 * totals['wall_time'] / moves:.3f}", f"{1000 * totals['max_wall_time']:.3f}",
+                     f"{1000 * totals['cpu_time'] / moves:.3f}", f"{totals['nodes'] / moves:.1f}",
+                     f"{totals['depth'] / max(totals['searches'], 1):.1f}",
+                     f"{totals['cache_hits'] / probes:.1%}" if probes else "-", str(totals["timeouts"]),
+                     " ".join(f"{source}={count}" for source, count in sorted(totals["sources"].items()))))
+# every column is as wide as its widest entry
+    widths = [max(len(row[index]) for row in rows) for index in range(len(header))]
+    return "\n".join("  ".join(entry.ljust(width) for entry, width in zip(row, widths)).rstrip() for row in rows)
+
+
+def run_tournament(competitor_list, games=1000, workers=None, seed=None, metrics=None):
+    """
+    This function plays a number of games between two competitors, spread over a pool of processes, and counts 
+    the results.
+    
+    Parameters
+    ----------
+    competitor_list (list)
+            The two competitors, alternating who plays first from game to game.
+    games (int)
+            The number of games to play.
+    workers (int or None)
+            The number of processes to play in. None uses one per CPU, and 1 plays all games in this process.
+    seed (int or None)
+            If given, each game is seeded from it and its number so the results are the same on every run, with
+            any number of workers.
+    metrics (dict or None)
+            If given, the measurements of the competitors' moves are added up in it by competitor name (see 
+            add_metrics and metrics_table).
+            
+    Returns
+    -------
+    dict: the number of wins of each competitor by name, and the number of ties
+    """
+    if workers == 1:
+        hosts = [host.StrategyHost(competitor, MAX_WAIT_TIME) for competitor in competitor_list]
+        try:
+            winners = [play_game(hosts, game_nr, seed, metrics) for game_nr in range(games)]
+        finally:
+            for competitor in hosts:
+                competitor.close()
     else:
-# the current player who stopped the while loop after his move must be the winner so get his name from the competitor list and 
-# add it to the winners list
-        winners.append(competitor_list[game.current_player - 1].name)
-# list is reversed therby alternating the first turn of the game between players
-    competitor_list.reverse()
-
-# create dictionary to display the results of all 1,000 games
-dictionary = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(competitor_list,)) as executor:
+# hand out the games in chunks so that each game doesn't cost a round trip between the processes. map returns the
+# results in the order of the games no matter which worker finished first.
+            chunksize = max(1, games // (4 * (workers or os.cpu_count() or 1)))
+            winners = []
+            for winner, game_metrics in executor.map(play_worker_game, range(games), [seed] * games,
+                                                     chunksize=chunksize):
+                winners.append(winner)
+                if metrics is not None:
+                    merge_metrics(metrics, game_metrics)
+
+# create dictionary to display the results of all the games
+    dictionary = {}
 # loop through all results stored in the winners list
-for item in winners:
+    for item in winners:
     
 # For each unique item in the winners list a new key will be created since dictionaries can only have unique keys so there will 
 # only be keys for player names and for tie. The code further tries to access the value of the key and add one to  it for each time
 # it appears in the winners list. However, the first time a potential key is encountered in the list it is not yet a key and therfore 
 # has no value and returns the second arg given which is a zero. To bypass this problem, 1 is added to the zero value to count for the 
 # occurence of the key in the list. In subsequent occurences of the item in the list 1 is also added every time.
-    dictionary[item] = dictionary.get(item, 0) + 1
+        dictionary[item] = dictionary.get(item, 0) + 1
+    return dictionary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play a tournament between two Connect Four strategies.")
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes, one per CPU by default")
+    parser.add_argument("--seed", type=int, default=None, help="seed for repeatable results")
+    args = parser.parse_args()
+
+# list of instances of the RandomStrategy class. One uses default name while the other is provided
+    competitor_list = [rand.RandomStrategy(), rand.RandomStrategy("alter ego")]
     
-# display the dictionary with all the results
-print(dictionary)
+# display the dictionary with all the results, and the measurements of each competitor's moves
+    metrics = {}
+    print(run_tournament(competitor_list, args.games, args.workers, args.seed, metrics))
+    print(metrics_table(metrics))